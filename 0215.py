@@ -1,4 +1,12 @@
+import sys
 import numpy as np
+from vrp_model import from_dicts
+from vrp_route import route_cost, compute_energy as route_energy
+from vrp_cache import RouteCache
+from vrp_report import Plan, write_text
+from vrp_anneal import IncrementalEnergy, anneal
+from vrp_moves import steepest_descent
+from vrp_rng import BlockRNG
 
 # --- 設定 ---
 num_trucks = 10
@@ -26,78 +34,26 @@ for i in range(num_jobs):
     s = np.random.randint(1, 4)
     jobs.append({"id": i, "pickup": p, "drop": d, "size": s})
 
-# 混載ルート構築エンジン
+# 混載ルート構築エンジン（整数ID・配列モデル上で計算）
+problem = from_dicts(locations, dist, jobs, truck_cap)
+# 同じジョブ集合のルートは再計算しない（探索中もレポート出力時も共通で使う）
+route_cache = RouteCache(problem)
+
 def get_mixed_load_route(my_job_indices):
-    if not my_job_indices: return [], 0
-    unvisited_pickups = my_job_indices.copy()
-    on_board = []
-    current_loc = "中央区"
-    current_load = 0
-    total_dist = 0
-    history = []
-    
-    while unvisited_pickups or on_board:
-        best_target = None
-        min_d = float('inf')
-        target_type = ""
-        
-        # 候補1：積み（空き容量がある場合）
-        for idx in unvisited_pickups:
-            if current_load + jobs[idx]["size"] <= truck_cap:
-                d = dist[(current_loc, jobs[idx]["pickup"])]
-                if d < min_d: min_d, best_target, target_type = d, idx, "pickup"
-        
-        # 候補2：降ろし
-        for idx in on_board:
-            d = dist[(current_loc, jobs[idx]["drop"])]
-            if d < min_d: min_d, best_target, target_type = d, idx, "drop"
-        
-        if best_target is None: break
-        
-        total_dist += min_d
-        job = jobs[best_target]
-        
-        if target_type == "pickup":
-            current_loc = job["pickup"]
-            current_load += job["size"]
-            unvisited_pickups.remove(best_target)
-            on_board.append(best_target)
-            history.append({"type": "積", "loc": current_loc, "id": job["id"], "size": job["size"], "load": current_load, "dist": min_d})
-        else:
-            current_loc = job["drop"]
-            current_load -= job["size"]
-            on_board.remove(best_target)
-            history.append({"type": "降", "loc": current_loc, "id": job["id"], "size": job["size"], "load": current_load, "dist": min_d})
-            
-    total_dist += dist[(current_loc, "中央区")]
-    return history, total_dist
+    return route_cache.history(my_job_indices)
 
 def compute_energy(assignment):
-    score = 0
-    for t in range(num_trucks):
-        indices = [i for i, tid in enumerate(assignment) if tid == t]
-        _, d = get_mixed_load_route(indices)
-        score += d
-    return score
+    return route_energy(problem, assignment, num_trucks)
 
-# アニーリング探索
+# アニーリング探索（差分評価：積み替え元・先の2台だけ再ルーティング）
 def solve():
-    curr_assign = np.random.randint(0, num_trucks, num_jobs)
-    curr_E = compute_energy(curr_assign)
-    best_assign, best_E = curr_assign.copy(), curr_E
-    T = 100.0
-    for _ in range(15000):
-        idx = np.random.randint(num_jobs)
-        old, new = curr_assign[idx], np.random.randint(num_trucks)
-        if old == new: continue
-        curr_assign[idx] = new
-        new_E = compute_energy(curr_assign)
-        if new_E < curr_E or np.random.rand() < np.exp(-(new_E - curr_E) / T):
-            curr_E = new_E
-            if curr_E < best_E: best_E, best_assign = curr_E, curr_assign.copy()
-        else: curr_assign[idx] = old
-        T *= 0.9995
-    return best_assign, best_E
+    route_fn = lambda indices: route_cost(problem, indices)
+    best_assign, best_E = anneal(route_fn, num_trucks, num_jobs, iterations=15000,
+                                 cache=route_cache, rng=BlockRNG())
+    # 仕上げ：候補手を一括評価する最急降下法で局所最適まで詰める
+    engine = IncrementalEnergy(route_fn, num_trucks, best_assign, cache=route_cache)
+    best_E = steepest_descent(problem, engine)
+    return engine.assign, best_E
 
 best_assign, best_E = solve()
 
@@ -107,26 +63,8 @@ print("   巡回配送計画 最適化レポート (合わせ積み・完全混
 print("★" * 60)
 print(f"🎯 最終評価スコア: {best_E:.1f}\n")
 
-for t in range(num_trucks):
-    t_indices = [i for i, tid in enumerate(best_assign) if tid == t]
-    history, _ = get_mixed_load_route(t_indices)
-    
-    print(f"\n{'='*65}")
-    print(f"【積載車 {t}番】 運行指示書 (担当: {len(t_indices)}件)")
-    print(f"{'行動':<4} | {'地点':<6} | {'Job':<6} | {'サイズ':<4} | {'積載量':<5} | {'移動'}")
-    print("-" * 65)
-    
-    if not history:
-        print(" ※ 稼働なし")
-        continue
-
-    last_loc = "中央区"
-    for h in history:
-        act = f"[{h['type']}]"
-        print(f"{act:<4} | {h['loc']:<8} | ID:{h['id']:<3} | {h['size']:^6} | {h['load']:^6} | {h['dist']}km")
-        last_loc = h['loc']
-    print("-" * 65)
-    print(f" >>> 最終帰還: {dist[(last_loc, '中央区')]}km")
+plan = Plan(problem, best_assign, num_trucks, route=route_cache.route)
+write_text(plan, sys.stdout, width=65)
 
 # --- 全ジョブ可視化 ---
 print("\n" + "📋 【全100件】本日の配送依頼データ一覧")
@@ -136,4 +74,6 @@ print("-" * 45)
 for i, j in enumerate(jobs):
     if i % 20 == 0 and i != 0: print("-" * 45)
     print(f"ID:{i:<3} | {j['pickup']:<8} → {j['drop']:<8} | {j['size']:^6}")
-print("-" * 45)
\ No newline at end of file
+print("-" * 45)
+cs = route_cache.stats()
+print(f"ルートキャッシュ: ヒット {cs['hits']} / ミス {cs['misses']} (ヒット率 {cs['hit_rate']:.1%})")
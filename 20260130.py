@@ -1,4 +1,6 @@
 import numpy as np
+from vrp_model import from_dicts
+from vrp_route import sorted_pickup_cost, compute_energy as route_energy
 
 # =================================================================
 # 1. 基本設定と距離マトリクス
@@ -40,49 +42,17 @@ for _ in range(num_jobs):
 # =================================================================
 # 3. 最適化エンジン (エネルギー計算ロジック)
 # =================================================================
+# ジョブを配列モデルへ変換（地点は整数ID、ジョブは pickup/drop/size の配列）
+problem = from_dicts(locations, dist, jobs, truck_cap)
+
 def compute_energy(assignment):
     """
     配車計画の『ダメさ加減』を数値化する。
     距離が長いほど、また過積載が発生するほど数値（スコア）が高くなる。
+    各積載車は積み込み地点のエリア順にジョブを1件ずつ運び、最後に中央区へ戻る
+    （過積載には 1000/台 の重いペナルティ。vrp_route.sorted_pickup_cost を参照）。
     """
-    total_score = 0
-    penalty = 0
-    
-    for t in range(num_trucks):
-        # 積載車tに割り振られたジョブIDを取得
-        my_indices = [i for i, truck_id in enumerate(assignment) if truck_id == t]
-        if not my_indices: continue
-        
-        # 簡易ルート最適化：積み込み地点のエリア順に並べる
-        my_indices = sorted(my_indices, key=lambda i: locations.index(jobs[i]["pickup"]))
-        
-        current_loc = "中央区"  # 全車、中央区からスタート
-        current_load = 0
-        
-        for idx in my_indices:
-            job = jobs[idx]
-            
-            # A. 積み込み地点への移動距離を加算
-            total_score += dist[(current_loc, job["pickup"])]
-            current_loc = job["pickup"]
-            
-            # B. 積み込み実行と過積載チェック
-            current_load += job["size"]
-            if current_load > truck_cap:
-                # 過積載には非常に重いペナルティ(1000)を課す
-                penalty += 1000 * (current_load - truck_cap)
-            
-            # C. 荷降ろし地点への移動距離を加算
-            total_score += dist[(current_loc, job["drop"])]
-            current_loc = job["drop"]
-            
-            # D. 荷降ろし完了（ここで荷台の空き枠が復活！）
-            current_load -= job["size"]
-            
-        # E. 全ての仕事を終えて拠点（中央区）に戻る距離
-        total_score += dist[(current_loc, "中央区")]
-        
-    return total_score + penalty
+    return route_energy(problem, assignment, num_trucks, route_fn=sorted_pickup_cost)
 
 # =================================================================
 # 4. アニーリング探索 (試行錯誤アルゴリズム)
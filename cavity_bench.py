@@ -0,0 +1,129 @@
+"""
+Speed and accuracy benchmark of the cavity-flow solver (CavityCase).
+
+Runs the standard cases Re 100/400/1000 at several N x N resolutions to steady
+state (or endT), one after another, and records per case:
+  time per step, SOR sweeps (cycles) per step, residual/sweep histories,
+  MLUPS of the predictor, one pressure sweep and the corrector (timed on the
+  final fields), and the deviation of the centerline velocities from Ghia et al.
+Results go to a JSON file, so that every change of the kernels or the pressure
+solver gets a measured speed and accuracy verdict (compare two files).
+
+    python cavity_bench.py --out bench_cavity.json
+    python cavity_bench.py --re 100,1000 --sizes 33,65 --solver multigrid --dtype float32
+"""
+import argparse
+import json
+import platform
+import time
+import numpy as np
+from cavity_case import CavityCase, load_backend
+from cavity_ghia import GHIA_U, ghia_errors
+
+# kernel fields, timing and MLUPS shared by the cavity benchmarks (cavity_scaling, cavity_precision);
+# kept here rather than in cavity_scaling, which needs numba
+def make_fields(N, Lx=0.1, Uwall=0.01, Re=1000.0, seed=0, dtype=np.float64):
+    # a developed-looking random field so that the kernels do real arithmetic
+    # dtype: velocity fields (p and div are always float64, as in CavityCase)
+    rng = np.random.default_rng(seed)
+    dx = dy = Lx/(N-1)
+    nu = Uwall*Lx/Re
+    dt = min(0.5*dx/Uwall, 0.8*dx*dx/nu)
+    u = (1e-3*rng.standard_normal((N+1, N+2))).astype(dtype)
+    v = (1e-3*rng.standard_normal((N+2, N+1))).astype(dtype)
+    p = np.zeros((N+1, N+1))
+    return dict(u=u, v=v, p=p, uaux=np.zeros_like(u), vaux=np.zeros_like(v), dive=np.zeros_like(p),
+                dx=dx, dy=dy, dt=dt, nu=nu, Uwall=Uwall)
+
+def best_of(fn, repeat=3, calls=1):
+    # seconds per call of fn(): best of repeat runs of calls calls each
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, time.perf_counter()-t0)
+    return best/calls
+
+def mlups(Nx, Ny, seconds):
+    # million cell updates per second; the kernels update the (Nx-1) x (Ny-1) interior cells
+    return (Nx-1)*(Ny-1)/seconds/1e6
+
+def kernel_mlups(case, repeat=3):
+    # time the kernels on copies of the case fields; the pressure sweep runs on the case's own
+    # p and div (pressure_iteration), so p is put back afterwards
+    c = case
+    u, v, p = c.u.copy(), c.v.copy(), c.p.copy()
+    uaux, vaux, dive = c.uaux.copy(), c.vaux.copy(), c.dive.copy()
+    k = c.kernels
+    calls = max(1, int(1e6//(c.Nx*c.Ny)))
+    t = {"predictor": best_of(lambda: k.predictor(u, v, uaux, vaux, dive, c.dx, c.dy, c.dt, c.nu, c.Uwall),
+                              repeat, calls),
+         "pressure": best_of(c.pressure_iteration, repeat, calls),
+         "corrector": best_of(lambda: k.corrector(u, v, uaux, vaux, p, c.dx, c.dy, c.dt, c.Uwall),
+                              repeat, calls)}
+    np.copyto(c.p, p)
+    return {"ms": {n: 1e3*s for n, s in t.items()}, "mlups": {n: mlups(c.Nx, c.Ny, s) for n, s in t.items()}}
+
+def run_case(Re, N, endT, steady_tol, solver, backend, dtype, history=True):
+    case = CavityCase(N, N, 0.1, 0.1, 0.01, 0.01*0.1/Re, pressure_solver=solver, backend=backend, dtype=dtype)
+    t0 = time.perf_counter()
+    status = case.run(endT, steady_tol)
+    elapsed = time.perf_counter()-t0
+    result = case.summary()
+    result.update(N=N, status=status, elapsed=elapsed, ms_per_step=1e3*elapsed/max(case.itr, 1))
+    result["kernels"] = kernel_mlups(case)
+    ms = result["kernels"]["ms"]
+    # step time the kernels account for (the rest is Python / control overhead)
+    result["ms_per_step_kernels"] = ms["predictor"] + result["sweeps_mean"]*ms["pressure"] + ms["corrector"]
+    result["ghia"] = ghia_errors(case) if int(round(Re)) in GHIA_U else None
+    if history:
+        h = case.history
+        result["history"] = {"t": [tt*case.Uref/case.Lx for tt in h["t"]], "dt": h["dt"],
+                             "err_r": [float(e) for e in h["err_r"]], "sweeps": [int(s) for s in h["sweeps"]],
+                             "rate": [float(r) for r in h["rate"]]}
+    return result
+
+def warm_up(solver, backend, dtype):
+    # compile (or load from the cache) every kernel the cases use, outside the timings
+    CavityCase(9, 9, pressure_solver=solver, backend=backend, dtype=dtype).run(1.0, 0.0)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--out", default="bench_cavity.json")
+    ap.add_argument("--re", default="100,400,1000", help="Reynolds numbers Uwall*L/nu")
+    ap.add_argument("--sizes", default="33,65,129", help="grid sizes N (N x N)")
+    ap.add_argument("--endT", type=float, default=200.0, help="max. time in L/Uwall")
+    ap.add_argument("--steady-tol", type=float, default=1.e-4, help="steady-state tolerance (0: run to endT)")
+    ap.add_argument("--solver", default="sor", choices=["sor", "redblack", "multigrid", "dct"])
+    ap.add_argument("--backend", default="numba", choices=["numba", "numpy"])
+    ap.add_argument("--dtype", default="float64", choices=["float64", "float32"],
+                    help="velocity storage (float32 is slower below N of a few hundred, see cavity_precision.py)")
+    ap.add_argument("--threads", type=int, default=None, help="kernel threads (default: all cores)")
+    ap.add_argument("--no-history", action="store_true", help="leave the per-step histories out of the file")
+    args = ap.parse_args(argv)
+
+    re_list = [float(s) for s in args.re.split(",")]
+    sizes = [int(s) for s in args.sizes.split(",")]
+    threads = load_backend(args.backend).set_threads(args.threads)
+    warm_up(args.solver, args.backend, args.dtype)
+    results = []
+    for Re in re_list:
+        for N in sizes:
+            r = run_case(Re, N, args.endT, args.steady_tol, args.solver, args.backend, args.dtype,
+                         history=not args.no_history)
+            results.append(r)
+            m = r["kernels"]["mlups"]
+            g = r["ghia"]
+            print(f"Re={Re:>7.1f} N={N:>5} {r['status']:>6} steps {r['steps']:>6}  {r['ms_per_step']:8.3f} ms/step  "
+                  f"SOR {r['sweeps_mean']:6.1f}/step  MLUPS pred {m['predictor']:7.1f} "
+                  f"pres {m['pressure']:7.1f} corr {m['corrector']:7.1f}"
+                  + (f"  Ghia u/v rms {g['u_rms']:.4f}/{g['v_rms']:.4f}" if g else ""))
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"python": platform.python_version(), "numpy": np.__version__, "threads": threads,
+                   "machine": platform.machine(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "settings": vars(args), "results": results}, f, indent=1)
+    print("saved '"+args.out+"'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import numpy as np
+import cavity_control
+import cavity_pressure
+
+# lid-driven cavity case: grid, physics and solver settings are arguments, so one process can
+# run any number of configurations (the kernels take everything as arguments, nothing is a
+# compile-time global). kadai1.py runs one case, cavity_sweep.py runs many on a process pool.
+# staggered grid: u[Ny+1, Nx+2], v[Ny+2, Nx+1], p/div[Ny+1, Nx+1] (Nx-1 x Ny-1 cells)
+
+def load_backend(name):
+    # kernel module: "numba" (compiled prange loops) or "numpy" (array slices, no numba needed)
+    if name == "numba":
+        import cavity_kernels
+        return cavity_kernels
+    if name == "numpy":
+        import cavity_numpy
+        return cavity_numpy
+    raise ValueError("unknown backend: "+name)
+
+class CavityCase:
+    def __init__(self, Nx=41, Ny=43, Lx=0.1, Ly=None, Uwall=0.01, nu=1.e-6,
+                 CFL=0.5, CFLv=0.8, adaptive_dt=True, dt_growth=1.2,
+                 accel=1.925e0, err_tol=1.e-6, tiny=1.e-20,
+                 sor_tol_start=1.e-3, sor_tol_factor=0.9, max_sor=10000,
+                 pressure_solver="sor", backend="numba", dtype=np.float64):
+        # pressure_solver: "sor" (lexicographic SOR fused into time_step; red-black with the
+        # numpy backend), "redblack", "multigrid" or "dct"
+        # dtype: storage of the velocity fields (u, v, uaux, vaux); np.float32 halves the memory
+        # traffic of the momentum kernels. p and div stay float64 and the scalars (dx, dt, ...)
+        # are float64, so the arithmetic and the pressure solve are double precision.
+        # float32 is only a speed option on large grids: every load/store converts, so while the
+        # fields fit in the caches it is slower (about 0.7-0.85x at N <= 128); it wins once they
+        # do not (1.1x from N = 256-1024 depending on the cache, 1.35-1.6x at 2048). Measure the
+        # crossover on the target machine with cavity_precision.py.
+        Ly = Lx if Ly is None else Ly
+        self.Nx, self.Ny, self.Lx, self.Ly = Nx, Ny, Lx, Ly
+        self.Uwall, self.nu = Uwall, nu
+        self.CFL, self.CFLv = CFL, CFLv
+        self.adaptive_dt, self.dt_growth = adaptive_dt, dt_growth
+        self.accel, self.tiny = accel, tiny
+        self.pressure_solver, self.backend = pressure_solver, backend
+        self.dtype = np.dtype(dtype)
+
+        self.dx = Lx/np.float64(Nx-1)
+        self.dy = Ly/np.float64(Ny-1)
+        # cell centres scaled by Lx (first/last are the ghost cells)
+        self.xc = (np.arange(Nx+1)-0.5)*self.dx/Lx
+        self.yc = (np.arange(Ny+1)-0.5)*self.dy/Lx
+        self.Uref = Uwall if Uwall != 0.0 else nu/Lx
+        self.dt = min(CFL*self.dx/self.Uref, CFLv*self.dx*self.dx/nu) # initial dt
+
+        self.u = np.zeros([Ny+1, Nx+2], dtype=self.dtype)
+        self.v = np.zeros([Ny+2, Nx+1], dtype=self.dtype)
+        self.p = np.zeros([Ny+1, Nx+1], dtype=np.float64)
+        self.uaux = np.zeros_like(self.u)
+        self.vaux = np.zeros_like(self.v)
+        self.dive = np.zeros_like(self.p)
+
+        self.kernels = load_backend(backend)
+        dx2, dy2 = self.dx*self.dx, self.dy*self.dy
+        solvers = self.kernels if backend == "numpy" else cavity_pressure
+        if pressure_solver == "redblack":
+            self.solver = solvers.RedBlackSOR(dx2, dy2, accel=accel, err_tol=err_tol, tiny=tiny)
+        elif pressure_solver == "multigrid":
+            self.solver = cavity_pressure.Multigrid(self.p.shape, dx2, dy2, err_tol=err_tol)
+        elif pressure_solver == "dct":
+            self.solver = solvers.DCTSolver(self.p.shape, dx2, dy2)
+        elif pressure_solver == "sor":
+            self.solver = None
+        else:
+            raise ValueError("unknown pressure_solver: "+pressure_solver)
+        self.tol_schedule = cavity_control.TolSchedule(err_tol, sor_tol_start, sor_tol_factor, max_sor)
+
+        self.t = 0.e0; self.itr = 0
+        self.sweeps = 0
+        self.rate = np.inf
+        # history per step: time, dt, final SOR residual, sweeps (cycles), steady-state rate
+        self.history = {"t": [], "dt": [], "err_r": [], "sweeps": [], "rate": []}
+
+    @property
+    def Re(self):
+        return self.Uwall*self.Ly/self.nu
+
+    def fields(self):
+        return dict(u=self.u, v=self.v, p=self.p)
+
+    def restore(self, state):
+        # continue from a checkpoint (cavity_output.load_checkpoint)
+        self.u[:], self.v[:], self.p[:] = state["u"], state["v"], state["p"]
+        self.itr, self.t, self.dt = state["itr"], state["t"], state["dt"]
+
+    def step(self):
+        # one projection step with the current dt, returns (err_r, SOR sweeps / cycles)
+        k = self.kernels
+        tol = self.tol_schedule(self.itr)
+        if self.solver is None:
+            return k.time_step(self.u, self.v, self.p, self.uaux, self.vaux, self.dive,
+                               self.dx, self.dy, self.dt, self.nu, self.Uwall,
+                               self.accel, tol, self.tiny, self.tol_schedule.max_sweeps)
+        k.predictor(self.u, self.v, self.uaux, self.vaux, self.dive,
+                    self.dx, self.dy, self.dt, self.nu, self.Uwall)
+        err_r, itr_SOR = self.solver.solve(self.p, self.dive, self.tol_schedule.max_sweeps, err_tol=tol)
+        if not np.isnan(err_r):
+            k.corrector(self.u, self.v, self.uaux, self.vaux, self.p,
+                        self.dx, self.dy, self.dt, self.Uwall)
+        return err_r, itr_SOR
+
+    def pressure_iteration(self):
+        # one sweep (cycle, direct solve) of the pressure solver on the current div, for timing
+        if self.solver is not None:
+            return self.solver.solve(self.p, self.dive, 0, err_tol=0.0)
+        if self.backend == "numpy":
+            return self.kernels.sor_redblack(self.p, self.dive, self.dx*self.dx, self.dy*self.dy,
+                                             self.accel, self.tiny), 1
+        return self.kernels.calcP(self.p, self.dive, self.dx, self.dy, self.accel, self.tiny), 1
+
+    def run(self, endT=100, steady_tol=1.e-4, writer=None, frame_every=100, checkpoint_every=1000,
+            progress=None):
+        # march until t = endT (in Lx/Uref) or steady state (steady_tol=0: no check)
+        # writer: cavity_output.AsyncWriter for frames/checkpoints, progress(dT): called every step
+        # returns "steady", "endT" or "nan"
+        tend = endT*self.Lx/self.Uref
+        steady = cavity_control.SteadyState(self.u, self.v, self.Uref, self.Lx, tol=steady_tol, t=self.t)
+        status = "endT"
+        while self.t < tend:
+            err_r, self.sweeps = self.step()
+            if np.isnan(err_r):
+                status = "nan"
+                break
+            self.t += self.dt
+            if progress is not None:
+                progress(self.dt*self.Uref/self.Lx)
+            is_steady = steady_tol > 0.0 and steady(self.u, self.v, self.t)
+            self.rate = steady.rate
+            for key, val in zip(self.history, (self.t, self.dt, err_r, self.sweeps, self.rate)):
+                self.history[key].append(val)
+            if writer is not None and frame_every > 0 and (self.itr % frame_every == 0 or is_steady):
+                writer.snapshot(self.itr, self.t, **self.fields())
+
+            self.itr += 1
+            if is_steady:
+                status = "steady"
+                break
+            if self.adaptive_dt:
+                # the lid (Uwall) is the fastest velocity in the cavity but not among the interior faces
+                self.dt = min(cavity_control.cfl_dt(self.u, self.v, self.dx, self.dy, self.nu,
+                                                    self.CFL, self.CFLv, Umin=abs(self.Uwall)),
+                              self.dt_growth*self.dt)
+                assert self.dt*abs(self.Uwall) <= self.CFL*self.dx*(1.0 + 1.e-12)
+            if writer is not None and checkpoint_every > 0 and self.itr % checkpoint_every == 0:
+                writer.checkpoint(self.itr, self.t, self.dt, **self.fields())
+        if writer is not None and status != "nan":
+            writer.checkpoint(self.itr, self.t, self.dt, **self.fields())
+        return status
+
+    def centerlines(self):
+        # u(y) on x = Lx/2 and v(x) on y = Ly/2 in Uref, walls included, positions in Lx, Ly
+        # u[j, i] sits at x = (i-1)dx, y = (j-1/2)dy; v[j, i] at x = (i-1/2)dx, y = (j-1)dy
+        Nx, Ny = self.Nx, self.Ny
+        s = 0.5*self.Lx/self.dx + 1.0; i = min(int(s), Nx-1); w = s-i
+        y = np.concatenate(([0.0], (np.arange(1, Ny)-0.5)*self.dy/self.Ly, [1.0]))
+        uy = np.concatenate(([0.0], (1.0-w)*self.u[1:Ny, i] + w*self.u[1:Ny, i+1], [self.Uwall]))/self.Uref
+        s = 0.5*self.Ly/self.dy + 1.0; j = min(int(s), Ny-1); w = s-j
+        x = np.concatenate(([0.0], (np.arange(1, Nx)-0.5)*self.dx/self.Lx, [1.0]))
+        vx = np.concatenate(([0.0], (1.0-w)*self.v[j, 1:Nx] + w*self.v[j+1, 1:Nx], [0.0]))/self.Uref
+        return y, uy, x, vx
+
+    def summary(self):
+        h = self.history
+        sweeps = np.array(h["sweeps"]) if h["sweeps"] else np.zeros(1)
+        return {"Re": self.Re, "Nx": self.Nx, "Ny": self.Ny, "backend": self.backend,
+                "pressure_solver": self.pressure_solver, "dtype": self.dtype.name, "steps": self.itr,
+                "t": self.t*self.Uref/self.Lx, "rate": float(self.rate),
+                "sweeps_mean": float(sweeps.mean()), "sweeps_max": int(sweeps.max()),
+                "err_r": float(h["err_r"][-1]) if h["err_r"] else None}
@@ -0,0 +1,47 @@
+import numpy as np
+
+# time-loop control for the cavity solver (kadai1.py):
+#   cfl_dt        time step from the current velocities (convective CFL and viscous limits)
+#   TolSchedule   relative SOR tolerance per step: loose at the start, tightened down to err_tol
+#   SteadyState   stops the run when the velocity field no longer changes
+
+def cfl_dt(u, v, dx, dy, nu, CFL, CFLv, Umin=0.0):
+    # max |u|, |v| over the interior faces (the ghost rows of u carry 2*Uwall-u), at least Umin:
+    # pass the lid speed, the interior faces do not include the lid
+    umax = max(np.max(np.abs(u[1:-1, 1:-1])), Umin)
+    vmax = max(np.max(np.abs(v[1:-1, 1:-1])), Umin)
+    dt = CFLv*min(dx, dy)**2/nu
+    if umax > 0.0:
+        dt = min(dt, CFL*dx/umax)
+    if vmax > 0.0:
+        dt = min(dt, CFL*dy/vmax)
+    return dt
+
+class TolSchedule:
+    # tolerance for step itr: max(err_tol, start*factor**itr); the pressure is warm-started
+    # from the previous step, so the loose early solves are corrected in the following steps
+    def __init__(self, err_tol, start=1.e-3, factor=0.9, max_sweeps=10000):
+        self.err_tol, self.start, self.factor = err_tol, start, factor
+        self.max_sweeps = max_sweeps  # cap of sweeps (cycles) per step, < 0: no cap
+
+    def __call__(self, itr):
+        return max(self.err_tol, self.start*self.factor**itr)
+
+class SteadyState:
+    # rate = max|u^n - u^m| / Uref / ((t^n - t^m) Uref/Lref), checked every `every` steps
+    def __init__(self, u, v, Uref, Lref, tol=1.e-4, every=10, t=0.0):
+        self.u0, self.v0 = u.copy(), v.copy()
+        self.Uref, self.Lref = Uref, Lref
+        self.tol, self.every = tol, every
+        self.t0 = t; self.n = 0
+        self.rate = np.inf
+
+    def __call__(self, u, v, t):
+        # True when steady
+        self.n += 1
+        if self.n % self.every != 0 or t <= self.t0:
+            return False
+        du = max(np.max(np.abs(u-self.u0)), np.max(np.abs(v-self.v0)))
+        self.rate = du/self.Uref/((t-self.t0)*self.Uref/self.Lref)
+        np.copyto(self.u0, u); np.copyto(self.v0, v); self.t0 = t
+        return self.rate < self.tol
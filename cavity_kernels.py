@@ -0,0 +1,161 @@
+import numpy as np
+import numba
+from numba import jit, prange
+from cavity_pressure import set_bc_neumann, residual, div_norm
+
+# fractional-step kernels of kadai1.py with the grid and physics passed as arguments
+# staggered grid: u[Ny+1, Nx+2], v[Ny+2, Nx+1], p/div[Ny+1, Nx+1]
+# the stencil loops are prange over rows (each row is independent);
+# the number of threads is set with set_threads() (1 = serial)
+# cache=True: the machine code is stored next to this file, so new processes
+# (e.g. the workers of cavity_sweep.py) load it instead of compiling again
+
+def set_threads(n=None):
+    # n=None: all cores numba can use
+    numba.set_num_threads(numba.config.NUMBA_NUM_THREADS if n is None else n)
+    return numba.get_num_threads()
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def calc_aux_u(uaux, u, v, dx, dy, dt, nu):
+    Ny, Nx = u.shape[0]-1, u.shape[1]-2
+    dx2 = dx*dx; dy2 = dy*dy
+    for jc in prange(1, Ny):
+        for i in range(1, Nx+1):
+            visc = (u[jc, i-1]-2e0*u[jc,i]+u[jc, i+1])/dx2 \
+                    +(u[jc-1, i]-2e0*u[jc,i]+u[jc+1, i])/dy2
+            conv = (+( ( u[jc, i-1] + u[jc, i])/2e0 \
+                              *(-u[jc, i-1]+u[jc, i])/dx ) \
+                          +( ( u[jc, i]+u[jc, i+1])/2e0 \
+                              *(-u[jc, i]+u[jc, i+1])/dx ) \
+                         )/2e0 \
+                        +(+( ( v[jc, i-1]+v[jc, i])/2e0 \
+                               *(-u[jc-1,i]+u[jc, i])/dy ) \
+                            +( ( v[jc+1, i-1] + v[jc+1,i])/2e0 \
+                               *(-u[jc,i]+u[jc+1,i])/dy ) \
+                         )/2e0
+            uaux[jc,i] = u[jc,i] + dt*(-conv + nu*visc)
+
+@jit(nopython=True, fastmath=True, cache=True)
+def set_bc_u(u, Uwall):
+    Ny, Nx = u.shape[0]-1, u.shape[1]-2
+    # left and right walls
+    for jc in range(0,Ny+1):
+        u[jc,1] =0.e0;
+        u[jc,Nx]=0.e0
+    # bottom and top walls (embedded)
+    for i in range(0,Nx+2):
+        u[0,i] = -u[1,i]  # bottom wall (uc=0)
+        u[Ny,i] = -u[Ny-1,i]+2.e0*Uwall # moving wall (uc=Uwall)
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def calc_aux_v(vaux, u, v, dx, dy, dt, nu):
+    Ny, Nx = v.shape[0]-2, v.shape[1]-1
+    dx2 = dx*dx; dy2 = dy*dy
+    for j in prange(1, Ny+1):
+        for ic in range(1, Nx):
+            visc = (v[j-1, ic]-2e0*v[j, ic]+v[j+1, ic])/dy2 \
+                    +(v[j, ic-1]-2e0*v[j, ic]+v[j, ic+1])/dx2
+            conv = (+( ( u[j-1, ic]+u[j, ic])/2e0 \
+                              *(-v[j, ic-1]+v[j, ic])/dx ) \
+                          +( ( u[j-1, ic+1]+u[j, ic+1])/2e0 \
+                              *(-v[j, ic]+v[j, ic+1])/dx ) \
+                         )/2e0 \
+                       +(+( ( v[j-1, ic]+v[j, ic])/2e0 \
+                              *(-v[j-1, ic]+v[j, ic])/dy ) \
+                           +( ( v[j, ic]+v[j+1, ic])/2e0 \
+                              *(-v[j, ic]+v[j+1, ic])/dy ) \
+                         )/2e0
+            vaux[j, ic] = v[j, ic] + dt*(-conv + nu*visc)
+
+@jit(nopython=True, fastmath=True, cache=True)
+def set_bc_v(v):
+    Ny, Nx = v.shape[0]-2, v.shape[1]-1
+    # left and right walls (embedded)
+    for j in range(0,Ny+2):
+        v[j,0] = -v[j,1]
+        v[j,Nx]= -v[j,Nx-1]
+    # bottom and top walls (on walls)
+    for ic in range(0,Nx+1):
+        v[1,ic]  =0.e0
+        v[Ny,ic] =0.e0
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def divergence(div, u, v, dx, dy, dt):
+    Ny, Nx = div.shape[0]-1, div.shape[1]-1
+    for jc in prange(1,Ny):
+        for ic in range(1,Nx):
+            div[jc,ic] = ( (-u[jc,ic] + u[jc, ic+1])/dx \
+                       +(-v[jc,ic] + v[jc+1, ic])/dy \
+                      )/dt
+
+@jit(nopython=True, fastmath=True, cache=True)
+def calcP(p, div, dx, dy, accel, tiny):
+    # one lexicographic SOR sweep (serial: each point reads the points updated just before)
+    # returns the update norm |dp|/|p|, the stopping test of time_step
+    Ny, Nx = p.shape[0]-1, p.shape[1]-1
+    dx2 = dx*dx; dy2 = dy*dy
+    err_n=0.0
+    err_d=0.0
+    for jc in range(1,Ny):
+        for ic in range(1,Nx):
+            d_pres = (  dy2*(p[jc, ic-1] + p[jc, ic+1]) \
+                             + dx2*(p[jc-1,ic] + p[jc+1,ic]) \
+                           - (dx2*dy2 * div[jc,ic]) )/((dx2+dy2)*2e0) - p[jc,ic]
+            p[jc,ic] = p[jc,ic] + accel*d_pres
+            err_n = err_n + d_pres*d_pres
+            err_d = err_d + p[jc,ic]*p[jc,ic]
+    set_bc_neumann(p)
+    if err_d < tiny:
+        err_d = 1e0
+    err_r = np.sqrt(err_n/err_d)
+    return err_r
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def correct_u(u, uaux, p, dx, dt):
+    Ny, Nx = u.shape[0]-1, u.shape[1]-2
+    for jc in prange(1, Ny):
+        for i in range(1, Nx+1):
+            u[jc, i] = uaux[jc, i] - dt*(-p[jc, i-1] + p[jc, i])/dx
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def correct_v(v, vaux, p, dy, dt):
+    Ny, Nx = v.shape[0]-2, v.shape[1]-1
+    for j in prange(1, Ny+1):
+        for ic in range(1, Nx):
+            v[j, ic] = vaux[j, ic] - dt*(-p[j-1, ic] + p[j, ic])/dy
+
+@jit(nopython=True, fastmath=True, cache=True)
+def predictor(u, v, uaux, vaux, dive, dx, dy, dt, nu, Uwall):
+    calc_aux_u(uaux, u, v, dx, dy, dt, nu)
+    set_bc_u(uaux, Uwall)
+    calc_aux_v(vaux, u, v, dx, dy, dt, nu)
+    set_bc_v(vaux)
+    divergence(dive, uaux, vaux, dx, dy, dt)
+
+@jit(nopython=True, fastmath=True, cache=True)
+def corrector(u, v, uaux, vaux, p, dx, dy, dt, Uwall):
+    correct_u(u, uaux, p, dx, dt)
+    set_bc_u(u, Uwall)
+    correct_v(v, vaux, p, dy, dt)
+    set_bc_v(v)
+
+# one projection step (aux. velocities -> BC -> divergence -> pressure -> correction)
+# fused into a single compiled call; max_SOR < 0 means no cap on SOR sweeps
+# SOR stops on the update norm; err_r is the relative residual |div - L p| / |div|, computed once
+# after the sweeps, as for the cavity_pressure solvers
+@jit(nopython=True, fastmath=True, cache=True)
+def time_step(u, v, p, uaux, vaux, dive, dx, dy, dt, nu, Uwall, accel, err_tol, tiny, max_SOR):
+    predictor(u, v, uaux, vaux, dive, dx, dy, dt, nu, Uwall)
+
+    err_n=1.e0; itr_SOR=0
+    while err_n > err_tol:
+        itr_SOR += 1
+        err_n=calcP(p, dive, dx, dy, accel, tiny)
+        if max_SOR >= 0 and itr_SOR > max_SOR:
+            break
+    err_r = np.sqrt(residual(np.empty_like(p), p, dive, dx*dx, dy*dy))/div_norm(dive)
+    if np.isnan(err_r):
+        return err_r, itr_SOR
+
+    corrector(u, v, uaux, vaux, p, dx, dy, dt, Uwall)
+    return err_r, itr_SOR
@@ -0,0 +1,175 @@
+import numpy as np
+import cavity_pressure
+from cavity_pressure import dct2, idct2
+
+# pure-NumPy backend: same functions and arguments as cavity_kernels, written with array slices
+# (no compiler needed). The stencils evaluate the same expressions in the same order, so results
+# agree with the numba kernels to rounding (those are compiled with fastmath).
+# The lexicographic SOR sweep cannot be vectorized; time_step here uses red-black SOR instead.
+# Pressure solvers: RedBlackSOR and DCTSolver (same solve() interface as in cavity_pressure).
+
+def set_threads(n=None):
+    return 1
+
+def calc_aux_u(uaux, u, v, dx, dy, dt, nu):
+    Ny, Nx = u.shape[0]-1, u.shape[1]-2
+    dx2 = dx*dx; dy2 = dy*dy
+    uc = u[1:Ny, 1:Nx+1]
+    uw = u[1:Ny, 0:Nx]; ue = u[1:Ny, 2:Nx+2]
+    us = u[0:Ny-1, 1:Nx+1]; un = u[2:Ny+1, 1:Nx+1]
+    visc = (uw-2e0*uc+ue)/dx2 \
+            +(us-2e0*uc+un)/dy2
+    conv = (+( ( uw + uc)/2e0 \
+                      *(-uw+uc)/dx ) \
+                  +( ( uc+ue)/2e0 \
+                      *(-uc+ue)/dx ) \
+                 )/2e0 \
+                +(+( ( v[1:Ny, 0:Nx]+v[1:Ny, 1:Nx+1])/2e0 \
+                       *(-us+uc)/dy ) \
+                    +( ( v[2:Ny+1, 0:Nx] + v[2:Ny+1, 1:Nx+1])/2e0 \
+                       *(-uc+un)/dy ) \
+                 )/2e0
+    uaux[1:Ny, 1:Nx+1] = uc + dt*(-conv + nu*visc)
+
+def set_bc_u(u, Uwall):
+    Ny, Nx = u.shape[0]-1, u.shape[1]-2
+    # left and right walls
+    u[:, 1] = 0.e0
+    u[:, Nx] = 0.e0
+    # bottom and top walls (embedded)
+    u[0, :] = -u[1, :]
+    u[Ny, :] = -u[Ny-1, :]+2.e0*Uwall
+
+def calc_aux_v(vaux, u, v, dx, dy, dt, nu):
+    Ny, Nx = v.shape[0]-2, v.shape[1]-1
+    dx2 = dx*dx; dy2 = dy*dy
+    vc = v[1:Ny+1, 1:Nx]
+    vs = v[0:Ny, 1:Nx]; vn = v[2:Ny+2, 1:Nx]
+    vw = v[1:Ny+1, 0:Nx-1]; ve = v[1:Ny+1, 2:Nx+1]
+    visc = (vs-2e0*vc+vn)/dy2 \
+            +(vw-2e0*vc+ve)/dx2
+    conv = (+( ( u[0:Ny, 1:Nx]+u[1:Ny+1, 1:Nx])/2e0 \
+                      *(-vw+vc)/dx ) \
+                  +( ( u[0:Ny, 2:Nx+1]+u[1:Ny+1, 2:Nx+1])/2e0 \
+                      *(-vc+ve)/dx ) \
+                 )/2e0 \
+               +(+( ( vs+vc)/2e0 \
+                      *(-vs+vc)/dy ) \
+                   +( ( vc+vn)/2e0 \
+                      *(-vc+vn)/dy ) \
+                 )/2e0
+    vaux[1:Ny+1, 1:Nx] = vc + dt*(-conv + nu*visc)
+
+def set_bc_v(v):
+    Ny, Nx = v.shape[0]-2, v.shape[1]-1
+    # left and right walls (embedded)
+    v[:, 0] = -v[:, 1]
+    v[:, Nx] = -v[:, Nx-1]
+    # bottom and top walls (on walls)
+    v[1, :] = 0.e0
+    v[Ny, :] = 0.e0
+
+def divergence(div, u, v, dx, dy, dt):
+    Ny, Nx = div.shape[0]-1, div.shape[1]-1
+    div[1:Ny, 1:Nx] = ( (-u[1:Ny, 1:Nx] + u[1:Ny, 2:Nx+1])/dx \
+                      +(-v[1:Ny, 1:Nx] + v[2:Ny+1, 1:Nx])/dy \
+                     )/dt
+
+def set_bc_neumann(p):
+    p[0, 1:-1] = p[1, 1:-1]
+    p[-1, 1:-1] = p[-2, 1:-1]
+    p[1:-1, 0] = p[1:-1, 1]
+    p[1:-1, -1] = p[1:-1, -2]
+
+def sor_redblack(p, div, dx2, dy2, accel, tiny):
+    # one red + one black sweep as in cavity_pressure (returns the update norm |dp|/|p|);
+    # a colour is two strided slices
+    # (odd rows and even rows), which only read points of the other colour
+    ny, nx = p.shape
+    coef = 1e0/((dx2+dy2)*2e0)
+    err_n = 0.0
+    err_d = 0.0
+    for color in range(2):
+        for j0 in (1, 2):
+            i0 = 1 + (j0 + color + 1) % 2
+            rows, cols = slice(j0, ny-1, 2), slice(i0, nx-1, 2)
+            pc = p[rows, cols]
+            d_pres = (  dy2*(p[rows, i0-1:nx-2:2] + p[rows, i0+1:nx:2]) \
+                      + dx2*(p[j0-1:ny-2:2, cols] + p[j0+1:ny:2, cols]) \
+                      - (dx2*dy2*div[rows, cols]) )*coef - pc
+            pc += accel*d_pres
+            err_n += np.sum(d_pres*d_pres)
+            err_d += np.sum(pc*pc)
+    set_bc_neumann(p)
+    if err_d < tiny:
+        err_d = 1e0
+    return np.sqrt(err_n/err_d)
+
+class RedBlackSOR:
+    def __init__(self, dx2, dy2, accel=1.925e0, err_tol=1.e-6, tiny=1.e-20):
+        self.dx2, self.dy2 = dx2, dy2
+        self.accel, self.err_tol, self.tiny = accel, err_tol, tiny
+
+    def solve(self, p, div, max_iter=-1, err_tol=None):
+        # sweeps until |dp|/|p| < err_tol, returns the relative residual (as cavity_pressure.RedBlackSOR)
+        err_tol = self.err_tol if err_tol is None else err_tol
+        err_n = 1.e0; itr = 0
+        while err_n > err_tol:
+            itr += 1
+            err_n = sor_redblack(p, div, self.dx2, self.dy2, self.accel, self.tiny)
+            if max_iter >= 0 and itr > max_iter:
+                break
+        return relative_residual(p, div, self.dx2, self.dy2), itr
+
+def residual(r, p, div, dx2, dy2):
+    # r = div - L p on the interior, returns |r|^2
+    lap = (p[1:-1, :-2]-2e0*p[1:-1, 1:-1]+p[1:-1, 2:])/dx2 \
+         +(p[:-2, 1:-1]-2e0*p[1:-1, 1:-1]+p[2:, 1:-1])/dy2
+    r[1:-1, 1:-1] = div[1:-1, 1:-1] - lap
+    return np.sum(r[1:-1, 1:-1]**2)
+
+def div_norm(div):
+    den = np.sqrt(np.sum(div[1:-1, 1:-1]**2))
+    return den if den > 0e0 else 1e0
+
+def relative_residual(p, div, dx2, dy2, r=None):
+    if r is None:
+        r = np.zeros_like(p)
+    return np.sqrt(residual(r, p, div, dx2, dy2))/div_norm(div)
+
+class DCTSolver(cavity_pressure.DCTSolver):
+    # same transform, with the NumPy boundary condition and residual
+    def solve(self, p, div, max_iter=-1, err_tol=None):
+        d = dct2(dct2(div[1:-1, 1:-1], 0), 1)
+        p[1:-1, 1:-1] = idct2(idct2(d*self.inv, 0), 1)
+        set_bc_neumann(p)
+        return relative_residual(p, div, self.dx2, self.dy2), 1
+
+def correct_u(u, uaux, p, dx, dt):
+    Ny, Nx = u.shape[0]-1, u.shape[1]-2
+    u[1:Ny, 1:Nx+1] = uaux[1:Ny, 1:Nx+1] - dt*(-p[1:Ny, 0:Nx] + p[1:Ny, 1:Nx+1])/dx
+
+def correct_v(v, vaux, p, dy, dt):
+    Ny, Nx = v.shape[0]-2, v.shape[1]-1
+    v[1:Ny+1, 1:Nx] = vaux[1:Ny+1, 1:Nx] - dt*(-p[0:Ny, 1:Nx] + p[1:Ny+1, 1:Nx])/dy
+
+def predictor(u, v, uaux, vaux, dive, dx, dy, dt, nu, Uwall):
+    calc_aux_u(uaux, u, v, dx, dy, dt, nu)
+    set_bc_u(uaux, Uwall)
+    calc_aux_v(vaux, u, v, dx, dy, dt, nu)
+    set_bc_v(vaux)
+    divergence(dive, uaux, vaux, dx, dy, dt)
+
+def corrector(u, v, uaux, vaux, p, dx, dy, dt, Uwall):
+    correct_u(u, uaux, p, dx, dt)
+    set_bc_u(u, Uwall)
+    correct_v(v, vaux, p, dy, dt)
+    set_bc_v(v)
+
+def time_step(u, v, p, uaux, vaux, dive, dx, dy, dt, nu, Uwall, accel, err_tol, tiny, max_SOR):
+    predictor(u, v, uaux, vaux, dive, dx, dy, dt, nu, Uwall)
+    err_r, itr_SOR = RedBlackSOR(dx*dx, dy*dy, accel, err_tol, tiny).solve(p, dive, max_SOR)
+    if np.isnan(err_r):
+        return err_r, itr_SOR
+    corrector(u, v, uaux, vaux, p, dx, dy, dt, Uwall)
+    return err_r, itr_SOR
@@ -0,0 +1,94 @@
+import os
+import queue
+import threading
+import numpy as np
+
+# output of the cavity solver off the time loop:
+# snapshot()/checkpoint() copy the fields into one of `slots` preallocated buffers and return;
+# a background thread writes them (frames: compressed .npz and optional PNG, checkpoint: .npz
+# replaced atomically). The loop only waits when every buffer is still being written.
+
+class AsyncWriter:
+    def __init__(self, outdir, fields, slots=2, render=None, meta=None):
+        # fields: name -> array giving the buffer shapes/dtypes (e.g. u=u, v=v, p=p)
+        # render(fig, frame): draws a frame on a matplotlib Figure (None: no PNG)
+        # meta: constant arrays/values stored in every frame (grid, Re, ...)
+        os.makedirs(outdir, exist_ok=True)
+        self.outdir = outdir
+        self.render = render
+        self.meta = dict(meta or {})
+        self.buffers = [{k: np.empty_like(a) for k, a in fields.items()} for _ in range(slots)]
+        self.free = queue.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.jobs = queue.Queue()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="cavity-output", daemon=True)
+        self.thread.start()
+
+    def snapshot(self, itr, t, **fields):
+        self._submit("frame_%07d" % itr, fields, {"itr": itr, "t": t}, frame=True)
+
+    def checkpoint(self, itr, t, dt, **fields):
+        self._submit("checkpoint", fields, {"itr": itr, "t": t, "dt": dt}, frame=False)
+
+    def close(self):
+        # flush everything queued and stop the thread
+        self.jobs.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _submit(self, name, fields, scalars, frame):
+        if self.error is not None:
+            raise self.error
+        slot = self.free.get()
+        buf = self.buffers[slot]
+        for k, a in fields.items():
+            np.copyto(buf[k], a)
+        self.jobs.put((name, slot, scalars, frame))
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            name, slot, scalars, frame = job
+            try:
+                data = dict(self.buffers[slot], **scalars)
+                path = os.path.join(self.outdir, name)
+                if frame:
+                    np.savez_compressed(path+".npz", **self.meta, **data)
+                    if self.render is not None:
+                        self._write_png(path+".png", dict(self.meta, **data))
+                else:
+                    write_npz_atomic(path+".npz", data)
+            except Exception as e:  # reported to the solver thread at the next call
+                self.error = e
+            finally:
+                self.free.put(slot)
+
+    def _write_png(self, path, frame):
+        # Figure without pyplot: no GUI backend, safe off the main thread
+        from matplotlib.figure import Figure
+        fig = Figure()
+        self.render(fig, frame)
+        fig.savefig(path)
+
+def write_npz_atomic(path, data):
+    # write to a temporary file first so that a crash never leaves a broken checkpoint
+    tmp = path+".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **data)
+    os.replace(tmp, path)
+
+def load_checkpoint(outdir):
+    # dict of the saved fields and itr, t, dt (None when there is no checkpoint)
+    path = os.path.join(outdir, "checkpoint.npz")
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        state = {k: z[k] for k in z.files}
+    state["itr"] = int(state["itr"])
+    state["t"], state["dt"] = float(state["t"]), float(state["dt"])
+    return state
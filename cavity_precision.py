@@ -0,0 +1,104 @@
+"""
+Float32 vs float64 velocity storage for the cavity solver (CavityCase dtype).
+
+Throughput: predictor and corrector kernels (the momentum part, memory bound) on
+N x N random fields, MLUPS for both dtypes and the speedup of float32. Only the
+storage is float32 (the kernels compute in float64 and convert on every load and
+store), so float32 is slower while the fields fit in the caches and wins on large
+grids: measured 0.7-0.85x at N <= 128, about 1.1x at 256-1024 and 1.35-1.6x at
+2048; where it crosses 1 depends on the cache size (N = 256 to 1024 so far).
+Accuracy: Re 100/400/1000 runs to steady state in both dtypes, deviation from
+the Ghia et al. centerline profiles and between the two dtypes.
+
+    python cavity_precision.py --out precision_cavity.json
+    python cavity_precision.py --sizes 1024,2048 --re 100,1000 --grid 65
+"""
+import argparse
+import json
+import platform
+import time
+import numpy as np
+from cavity_case import CavityCase, load_backend
+from cavity_ghia import ghia_errors
+from cavity_bench import best_of, make_fields, mlups
+
+DTYPES = (np.float64, np.float32)
+
+def bench_throughput(kernels, N, repeat):
+    steps = max(1, int(2e7//(N*N)))  # about the same work per measurement
+    rows = {}
+    for dtype in DTYPES:
+        f = make_fields(N, dtype=dtype)
+        def predictor():
+            kernels.predictor(f["u"], f["v"], f["uaux"], f["vaux"], f["dive"],
+                              f["dx"], f["dy"], f["dt"], f["nu"], f["Uwall"])
+        def corrector():
+            kernels.corrector(f["u"], f["v"], f["uaux"], f["vaux"], f["p"],
+                              f["dx"], f["dy"], f["dt"], f["Uwall"])
+        predictor(); corrector()  # warm up (compile for this dtype)
+        t = {"predictor": best_of(predictor, repeat, steps), "corrector": best_of(corrector, repeat, steps)}
+        rows[np.dtype(dtype).name] = {"kernels_ms": {k: 1e3*s for k, s in t.items()},
+                                      "mlups": {k: mlups(N, N, s) for k, s in t.items()},
+                                      "field_mb": 4*(N+2)*(N+1)*np.dtype(dtype).itemsize/2**20}
+    t64 = sum(rows["float64"]["kernels_ms"].values())
+    t32 = sum(rows["float32"]["kernels_ms"].values())
+    return {"N": N, "steps": steps, "dtypes": rows, "speedup": t64/t32}
+
+def run_accuracy(Re, N, endT, steady_tol, solver, backend):
+    out = {"Re": Re, "N": N}
+    profiles = {}
+    for dtype in DTYPES:
+        case = CavityCase(N, N, 0.1, 0.1, 0.01, 0.01*0.1/Re, pressure_solver=solver, backend=backend,
+                          dtype=dtype)
+        t0 = time.perf_counter()
+        status = case.run(endT, steady_tol)
+        elapsed = time.perf_counter()-t0
+        name = case.dtype.name
+        profiles[name] = case.centerlines()
+        out[name] = dict(status=status, steps=case.itr, t=case.t*case.Uref/case.Lx, elapsed=elapsed,
+                         ms_per_step=1e3*elapsed/max(case.itr, 1), ghia=ghia_errors(case))
+    (_, u64, _, v64), (_, u32, _, v32) = profiles["float64"], profiles["float32"]
+    out["float32_vs_float64"] = {"u_max": float(np.max(np.abs(u32-u64))), "v_max": float(np.max(np.abs(v32-v64)))}
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--out", default="precision_cavity.json")
+    ap.add_argument("--sizes", default="64,256,1024,2048",
+                    help="grid sizes N for the throughput part (float32 only wins above the crossover)")
+    ap.add_argument("--re", default="100,400,1000", help="Reynolds numbers for the accuracy part")
+    ap.add_argument("--grid", type=int, default=65, help="grid size N for the accuracy part")
+    ap.add_argument("--endT", type=float, default=200.0, help="max. time in L/Uwall")
+    ap.add_argument("--steady-tol", type=float, default=1.e-4)
+    ap.add_argument("--solver", default="sor", choices=["sor", "redblack", "multigrid", "dct"])
+    ap.add_argument("--backend", default="numba", choices=["numba", "numpy"])
+    ap.add_argument("--threads", type=int, default=None, help="kernel threads (default: all cores)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    kernels = load_backend(args.backend)
+    kernels.set_threads(args.threads)
+    throughput = []
+    for N in (int(s) for s in args.sizes.split(",") if s):
+        r = bench_throughput(kernels, N, args.repeat)
+        throughput.append(r)
+        m = {k: r["dtypes"][k]["mlups"] for k in r["dtypes"]}
+        print(f"N={N:>5}  predictor {m['float64']['predictor']:8.1f} -> {m['float32']['predictor']:8.1f}  "
+              f"corrector {m['float64']['corrector']:8.1f} -> {m['float32']['corrector']:8.1f} MLUPS  "
+              f"speedup {r['speedup']:5.2f}")
+    accuracy = []
+    for Re in (float(s) for s in args.re.split(",") if s):
+        r = run_accuracy(Re, args.grid, args.endT, args.steady_tol, args.solver, args.backend)
+        accuracy.append(r)
+        g64, g32 = r["float64"]["ghia"], r["float32"]["ghia"]
+        print(f"Re={Re:>7.1f} N={args.grid}  Ghia u_max {g64['u_max']:.4f} / {g32['u_max']:.4f}  "
+              f"v_max {g64['v_max']:.4f} / {g32['v_max']:.4f} (float64 / float32)  "
+              f"|f32-f64| u {r['float32_vs_float64']['u_max']:.2e} v {r['float32_vs_float64']['v_max']:.2e}")
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"python": platform.python_version(), "numpy": np.__version__, "backend": args.backend,
+                   "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "settings": vars(args),
+                   "throughput": throughput, "accuracy": accuracy}, f, indent=1)
+    print("saved '"+args.out+"'")
+
+if __name__ == "__main__":
+    main()
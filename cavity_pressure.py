@@ -0,0 +1,223 @@
+import numpy as np
+try:
+    from numba import jit, prange
+except ImportError:  # without numba the loops below run as plain Python (cavity_numpy has the fast versions)
+    prange = range
+    def jit(*args, **kwargs):
+        return lambda f: f
+
+# pressure Poisson solvers for the staggered cavity grid
+#   (p[j,i-1]-2p[j,i]+p[j,i+1])/dx2 + (p[j-1,i]-2p[j,i]+p[j+1,i])/dy2 = div[j,i]
+# p and div have one ghost layer: unknowns are p[1:-1,1:-1], ghosts carry the
+# Neumann condition (p[0,:]=p[1,:] etc.), same layout as kadai1.py.
+# every solver object has solve(p, div, max_iter=-1, err_tol=None): works on p in place (warm
+# start from the current p) and returns (err_r, number of sweeps / cycles); max_iter < 0 means
+# no cap, err_tol=None uses the tolerance given to the constructor (the DCT solve is direct).
+# err_r is always the relative residual |div - L p| / |div|, so the solvers report the same
+# quantity. multigrid stops on it; the SOR loops stop on the update norm |dp|/|p| their sweep
+# returns for free and compute the residual once at the end (a residual pass per sweep costs
+# about as much as the sweep). the update norm understates the residual by a few times.
+
+
+@jit(nopython=True, fastmath=True, cache=True)
+def set_bc_neumann(p):
+    ny, nx = p.shape
+    for i in range(1, nx-1):
+        p[0, i] = p[1, i]
+        p[ny-1, i] = p[ny-2, i]
+    for j in range(1, ny-1):
+        p[j, 0] = p[j, 1]
+        p[j, nx-1] = p[j, nx-2]
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def residual(r, p, div, dx2, dy2):
+    # r = div - L p on the interior, returns |r|^2
+    ny, nx = p.shape
+    res = 0.0
+    for j in prange(1, ny-1):
+        for i in range(1, nx-1):
+            lap = (p[j, i-1]-2e0*p[j, i]+p[j, i+1])/dx2 \
+                 +(p[j-1, i]-2e0*p[j, i]+p[j+1, i])/dy2
+            r[j, i] = div[j, i] - lap
+            res += r[j, i]*r[j, i]
+    return res
+
+@jit(nopython=True, fastmath=True, cache=True)
+def div_norm(div):
+    # |div| on the interior, the denominator of the relative residual (1 when div = 0)
+    den = np.sqrt(np.sum(div[1:-1, 1:-1]**2))
+    return den if den > 0e0 else 1e0
+
+def relative_residual(p, div, dx2, dy2, r=None):
+    # |div - L p| / |div| (the err_r of every solver); r: work array like p
+    if r is None:
+        r = np.zeros_like(p)
+    return np.sqrt(residual(r, p, div, dx2, dy2))/div_norm(div)
+
+# ---------------------------------------------------------------------
+# red-black SOR: each colour only reads the other colour -> rows in parallel
+# ---------------------------------------------------------------------
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def sor_redblack(p, div, dx2, dy2, accel, tiny):
+    # one red + one black sweep, returns the update norm |dp|/|p| as the lexicographic calcP
+    ny, nx = p.shape
+    coef = 1e0/((dx2+dy2)*2e0)
+    err_n = 0.0
+    err_d = 0.0
+    for color in range(2):
+        for j in prange(1, ny-1):
+            for i in range(1 + (j + color + 1) % 2, nx-1, 2):
+                d_pres = (  dy2*(p[j, i-1] + p[j, i+1]) \
+                          + dx2*(p[j-1, i] + p[j+1, i]) \
+                          - (dx2*dy2*div[j, i]) )*coef - p[j, i]
+                p[j, i] = p[j, i] + accel*d_pres
+                err_n += d_pres*d_pres
+                err_d += p[j, i]*p[j, i]
+    set_bc_neumann(p)
+    if err_d < tiny:
+        err_d = 1e0
+    return np.sqrt(err_n/err_d)
+
+class RedBlackSOR:
+    def __init__(self, dx2, dy2, accel=1.925e0, err_tol=1.e-6, tiny=1.e-20):
+        self.dx2, self.dy2 = dx2, dy2
+        self.accel, self.err_tol, self.tiny = accel, err_tol, tiny
+
+    def solve(self, p, div, max_iter=-1, err_tol=None):
+        # sweeps until |dp|/|p| < err_tol, returns the relative residual
+        err_tol = self.err_tol if err_tol is None else err_tol
+        err_n = 1.e0; itr = 0
+        while err_n > err_tol:
+            itr += 1
+            err_n = sor_redblack(p, div, self.dx2, self.dy2, self.accel, self.tiny)
+            if max_iter >= 0 and itr > max_iter:
+                break
+        return relative_residual(p, div, self.dx2, self.dy2), itr
+
+# ---------------------------------------------------------------------
+# geometric multigrid V-cycle (cell centred, red-black Gauss-Seidel smoother)
+# ---------------------------------------------------------------------
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def smooth_rb(p, f, dx2, dy2, sweeps):
+    ny, nx = p.shape
+    coef = 1e0/((dx2+dy2)*2e0)
+    for s in range(sweeps):
+        for color in range(2):
+            for j in prange(1, ny-1):
+                for i in range(1 + (j + color + 1) % 2, nx-1, 2):
+                    p[j, i] = (  dy2*(p[j, i-1] + p[j, i+1]) \
+                               + dx2*(p[j-1, i] + p[j+1, i]) \
+                               - (dx2*dy2*f[j, i]) )*coef
+        set_bc_neumann(p)
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def restrict(fc, r):
+    # coarse cell (J,I) = average of its fine cells (2J-1..2J, 2I-1..2I); odd sizes have single children
+    nyf, nxf = r.shape[0]-2, r.shape[1]-2
+    nyc, nxc = fc.shape[0]-2, fc.shape[1]-2
+    for J in prange(1, nyc+1):
+        for I in range(1, nxc+1):
+            s = 0.0; n = 0
+            for j in range(2*J-1, min(2*J, nyf)+1):
+                for i in range(2*I-1, min(2*I, nxf)+1):
+                    s += r[j, i]; n += 1
+            fc[J, I] = s/n
+
+@jit(nopython=True, fastmath=True, parallel=True, cache=True)
+def prolong_add(p, ec):
+    # bilinear interpolation of the coarse correction (weights 9/16, 3/16, 3/16, 1/16)
+    nyf, nxf = p.shape[0]-2, p.shape[1]-2
+    for j in prange(1, nyf+1):
+        J = (j+1)//2
+        J2 = J-1 if j % 2 == 1 else J+1
+        for i in range(1, nxf+1):
+            I = (i+1)//2
+            I2 = I-1 if i % 2 == 1 else I+1
+            p[j, i] += 0.5625*ec[J, I] + 0.1875*(ec[J2, I] + ec[J, I2]) + 0.0625*ec[J2, I2]
+
+class Multigrid:
+    # level 0 is the fine grid (the caller's p/div); coarser levels are preallocated once
+    def __init__(self, shape, dx2, dy2, err_tol=1.e-6, pre=2, post=2, coarsest=4, coarse_sweeps=50):
+        self.err_tol = err_tol
+        self.pre, self.post, self.coarse_sweeps = pre, post, coarse_sweeps
+        self.levels = []  # (e, f, r, dx2, dy2) for coarse levels
+        ny, nx = shape[0]-2, shape[1]-2
+        self.r0 = np.zeros(shape)
+        self.dx2, self.dy2 = dx2, dy2
+        while min(ny, nx) > coarsest:
+            ny, nx = (ny+1)//2, (nx+1)//2
+            dx2, dy2 = 4e0*dx2, 4e0*dy2
+            self.levels.append((np.zeros((ny+2, nx+2)), np.zeros((ny+2, nx+2)),
+                                np.zeros((ny+2, nx+2)), dx2, dy2))
+
+    def vcycle(self, p, f, r, dx2, dy2, lev):
+        if lev == len(self.levels):
+            # coarsest: make the Neumann problem compatible and relax many times; the shifted
+            # source goes to the scratch r, since f is the caller's div when there are no levels
+            np.copyto(r, f)
+            r[1:-1, 1:-1] -= f[1:-1, 1:-1].mean()
+            smooth_rb(p, r, dx2, dy2, self.coarse_sweeps)
+            return
+        smooth_rb(p, f, dx2, dy2, self.pre)
+        residual(r, p, f, dx2, dy2)
+        ec, fc, rc, cdx2, cdy2 = self.levels[lev]
+        restrict(fc, r)
+        ec[:] = 0e0
+        self.vcycle(ec, fc, rc, cdx2, cdy2, lev+1)
+        set_bc_neumann(ec)
+        prolong_add(p, ec)
+        set_bc_neumann(p)
+        smooth_rb(p, f, dx2, dy2, self.post)
+
+    def solve(self, p, div, max_iter=-1, err_tol=None):
+        # V-cycles until |div - L p| / |div| < err_tol
+        err_tol = self.err_tol if err_tol is None else err_tol
+        den = div_norm(div)
+        err_r = np.sqrt(residual(self.r0, p, div, self.dx2, self.dy2))/den; itr = 0
+        while err_r > err_tol:
+            itr += 1
+            self.vcycle(p, div, self.r0, self.dx2, self.dy2, 0)
+            err_r = np.sqrt(residual(self.r0, p, div, self.dx2, self.dy2))/den
+            if max_iter >= 0 and itr > max_iter:
+                break
+        return err_r, itr
+
+# ---------------------------------------------------------------------
+# direct solve with the discrete cosine transform (uniform grid, Neumann box)
+# ---------------------------------------------------------------------
+def dct2(x, axis):
+    # unnormalized DCT-II  X_k = sum_n x_n cos(pi k (2n+1) / 2N), via a real FFT of the mirrored signal
+    n = x.shape[axis]
+    y = np.fft.rfft(np.concatenate([x, np.flip(x, axis)], axis=axis), axis=axis)
+    y = np.take(y, np.arange(n), axis=axis)
+    shape = [1]*x.ndim; shape[axis] = n
+    w = np.exp(-0.5j*np.pi*np.arange(n)/n).reshape(shape)
+    return 0.5*(w*y).real
+
+def idct2(X, axis):
+    # inverse of dct2:  x_n = (X_0 + 2 sum_k X_k cos(pi k (2n+1) / 2N)) / N
+    n = X.shape[axis]
+    shape = [1]*X.ndim; shape[axis] = n
+    w = np.exp(0.5j*np.pi*np.arange(n)/n).reshape(shape)
+    c = X*w
+    pad = [(0, 0)]*X.ndim; pad[axis] = (0, 1)
+    x = np.fft.irfft(np.pad(c, pad), n=2*n, axis=axis)
+    return 2e0*np.take(x, np.arange(n), axis=axis)
+
+class DCTSolver:
+    # eigenvalues of the 1D Neumann second difference are (2cos(pi k/N) - 2)/h^2
+    def __init__(self, shape, dx2, dy2):
+        ny, nx = shape[0]-2, shape[1]-2
+        lam_y = (2e0*np.cos(np.pi*np.arange(ny)/ny) - 2e0)/dy2
+        lam_x = (2e0*np.cos(np.pi*np.arange(nx)/nx) - 2e0)/dx2
+        lam = lam_y[:, None] + lam_x[None, :]
+        lam[0, 0] = 1e0  # constant mode: fixed to zero mean
+        self.inv = 1e0/lam
+        self.inv[0, 0] = 0e0
+        self.dx2, self.dy2 = dx2, dy2
+
+    def solve(self, p, div, max_iter=-1, err_tol=None):
+        d = dct2(dct2(div[1:-1, 1:-1], 0), 1)
+        p[1:-1, 1:-1] = idct2(idct2(d*self.inv, 0), 1)
+        set_bc_neumann(p)
+        return relative_residual(p, div, self.dx2, self.dy2), 1
@@ -0,0 +1,87 @@
+"""
+Thread scaling of the prange stencil kernels (cavity flow, kadai1.py).
+
+For each grid size N x N and thread count, time the predictor (aux. velocities,
+boundary conditions, divergence), a fixed number of red-black SOR sweeps and the
+corrector, and report time per step, MLUPS and speedup against 1 thread.
+
+    python cavity_scaling.py --out scaling_cavity.json
+    python cavity_scaling.py --sizes 64,128,256 --threads 1,2,4
+"""
+import argparse
+import json
+import platform
+import time
+import numba
+import numpy as np
+import cavity_kernels
+import cavity_pressure
+from cavity_bench import best_of, make_fields, mlups
+
+DEFAULT_SIZES = [64, 128, 256, 512, 1024, 2048]
+
+def default_threads():
+    # 1, 2, 4, ... up to all cores (and all cores itself)
+    n = numba.config.NUMBA_NUM_THREADS
+    out = [1]
+    while out[-1]*2 <= n:
+        out.append(out[-1]*2)
+    return out if out[-1] == n else out + [n]
+
+def bench_size(N, threads, steps, sweeps, repeat):
+    f = make_fields(N)
+    dx2, dy2 = f["dx"]**2, f["dy"]**2
+    def predictor():
+        cavity_kernels.predictor(f["u"], f["v"], f["uaux"], f["vaux"], f["dive"],
+                                 f["dx"], f["dy"], f["dt"], f["nu"], f["Uwall"])
+    def pressure():
+        cavity_pressure.sor_redblack(f["p"], f["dive"], dx2, dy2, 1.925, 1e-20)
+    def corrector():
+        cavity_kernels.corrector(f["u"], f["v"], f["uaux"], f["vaux"], f["p"],
+                                 f["dx"], f["dy"], f["dt"], f["Uwall"])
+    rows = []
+    for nt in threads:
+        cavity_kernels.set_threads(nt)
+        predictor(); pressure(); corrector()  # warm up (compile, caches) with this thread count
+        t = {"predictor": best_of(predictor, repeat, steps),
+             "pressure": best_of(pressure, repeat, steps*sweeps),
+             "corrector": best_of(corrector, repeat, steps)}
+        step = t["predictor"] + sweeps*t["pressure"] + t["corrector"]
+        rows.append({"threads": nt, "step_ms": 1e3*step,
+                     "kernels_ms": {k: 1e3*s for k, s in t.items()},
+                     "mlups": {k: mlups(N, N, s) for k, s in t.items()}})
+    base = rows[0]["step_ms"]
+    for r in rows:
+        r["speedup"] = base/r["step_ms"]
+        r["efficiency"] = r["speedup"]/r["threads"]
+    return {"N": N, "steps": steps, "sor_sweeps": sweeps, "threads": rows}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--out", default="scaling_cavity.json")
+    ap.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="grid sizes N (N x N)")
+    ap.add_argument("--threads", default=None, help="thread counts, e.g. 1,2,4,8 (default: powers of 2 up to all cores)")
+    ap.add_argument("--sweeps", type=int, default=10, help="red-black SOR sweeps per step")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    threads = [int(s) for s in args.threads.split(",")] if args.threads else default_threads()
+    results = []
+    for N in sizes:
+        steps = max(1, int(2e6//(N*N)))  # about the same work per measurement
+        r = bench_size(N, threads, steps, args.sweeps, args.repeat)
+        results.append(r)
+        for t in r["threads"]:
+            print(f"N={N:>5} threads={t['threads']:>3}  step {t['step_ms']:10.3f} ms  "
+                  f"predictor {t['mlups']['predictor']:8.1f}  pressure {t['mlups']['pressure']:8.1f}  "
+                  f"corrector {t['mlups']['corrector']:8.1f} MLUPS  speedup {t['speedup']:5.2f}")
+    cavity_kernels.set_threads()
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"python": platform.python_version(), "numpy": np.__version__, "numba": numba.__version__,
+                   "cores": numba.config.NUMBA_NUM_THREADS, "threading_layer": numba.threading_layer(),
+                   "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=1)
+    print("saved '"+args.out+"'")
+
+if __name__ == "__main__":
+    main()
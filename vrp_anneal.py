@@ -0,0 +1,326 @@
+import bisect
+import math
+import time
+import numpy as np
+
+# =================================================================
+# 差分エネルギー計算エンジン
+# =================================================================
+class IncrementalEnergy:
+    """
+    配車計画のエネルギーを差分で更新するエンジン。
+    トラックごとのジョブ集合とルート距離を保持し、1件の積み替えでは
+    移動元・移動先の2台だけを再ルーティングする。
+    件数ばらつきペナルティ（標準偏差 × count_weight）は件数の二乗和から O(1) で更新する。
+
+    route_fn: ジョブ番号の昇順リストを受け取り、そのトラックの走行距離を返す関数
+    cache: RouteCache を渡すとトラックごとのZobristハッシュを差分で保持し、
+           route_fn の代わりにキャッシュ経由で距離を求める
+    objective: vrp_objective.DispatchObjective を渡すと、車両ごとの容量・時間枠・勤務時間の項と
+               件数・距離の平準化項を加えたエネルギーにする（route_fn / cache / count_weight は使わない）。
+               車両ごとの項は変わった2台分だけ、平準化項は和と二乗和から O(1) で更新する
+    """
+    def __init__(self, route_fn, num_trucks, assignment, count_weight=0.0, cache=None, objective=None):
+        self.route_fn = route_fn
+        self.cache = cache
+        self.objective = objective
+        self.num_trucks = num_trucks
+        self.count_weight = count_weight if objective is None else objective.count_weight
+        self.assign = np.array(assignment, copy=True)
+        self.num_jobs = len(self.assign)
+
+        # トラックごとのジョブ番号（昇順を維持：元のルート構築と同じ同点処理になる）
+        self.members = [[] for _ in range(num_trucks)]
+        for i, t in enumerate(self.assign):
+            self.members[t].append(i)
+        self.extras = [0.0] * num_trucks   # 車両ごとの項（objective 使用時のみ）
+        if objective is not None:
+            self.hashes = [objective.hash_of(m) for m in self.members]
+            evals = [objective.evaluate(t, m, h) for t, (m, h) in enumerate(zip(self.members, self.hashes))]
+            self.costs = [c for c, _ in evals]
+            self.extras = [x for _, x in evals]
+        elif cache is not None:
+            self.hashes = [cache.hash_of(m) for m in self.members]
+            self.costs = [cache.cost(m, h) for m, h in zip(self.members, self.hashes)]
+        else:
+            self.hashes = [0] * num_trucks
+            self.costs = [route_fn(m) for m in self.members]
+        self.counts = [len(m) for m in self.members]
+
+        self.total_dist = sum(self.costs)
+        self.total_extra = sum(self.extras)
+        self.dist_sq = sum(c * c for c in self.costs)
+        self.sum_sq = sum(c * c for c in self.counts)
+        self._pending = None
+
+    def count_penalty(self, sum_sq=None):
+        """件数の標準偏差ペナルティ（np.std(counts) * count_weight と同値）"""
+        if not self.count_weight: return 0.0
+        if sum_sq is None: sum_sq = self.sum_sq
+        mean = self.num_jobs / self.num_trucks
+        var = max(sum_sq / self.num_trucks - mean * mean, 0.0)
+        return np.sqrt(var) * self.count_weight
+
+    def _energy(self, total_dist, total_extra, sum_sq, dist_sq, num_jobs=None):
+        if self.objective is None:
+            return total_dist + self.count_penalty(sum_sq)
+        if num_jobs is None: num_jobs = self.num_jobs
+        return total_dist + total_extra + self.objective.balance_penalty(num_jobs, sum_sq, total_dist, dist_sq)
+
+    @property
+    def energy(self):
+        return self._energy(self.total_dist, self.total_extra, self.sum_sq, self.dist_sq)
+
+    def _evaluate(self, t, m, h):
+        """トラック t のジョブ集合 m の (走行距離, 車両ごとの項)"""
+        if self.objective is not None:
+            return self.objective.evaluate(t, m, h)
+        if self.cache is not None:
+            return self.cache.cost(m, h), 0.0
+        return self.route_fn(m), 0.0
+
+    def _toggle(self, h, job):
+        if self.objective is not None: return self.objective.toggle(h, job)
+        if self.cache is not None: return self.cache.toggle(h, job)
+        return h
+
+    def propose(self, job, new_truck):
+        """ジョブ job を new_truck へ移した場合のエネルギーを返す（まだ確定しない）"""
+        old_truck = self.assign[job]
+        src = self.members[old_truck].copy()
+        src.remove(job)
+        dst = self.members[new_truck].copy()
+        bisect.insort(dst, job)
+        n_old, n_new = self.counts[old_truck], self.counts[new_truck]
+        # 件数の二乗和の変化: (n_old-1)^2 + (n_new+1)^2 - n_old^2 - n_new^2
+        new_sum_sq = self.sum_sq + 2 * (n_new - n_old) + 2
+        return self._stage([(job, new_truck)], [(old_truck, src, (job,)), (new_truck, dst, (job,))],
+                           new_sum_sq)
+
+    def propose_swap(self, job_a, job_b):
+        """別トラックのジョブ job_a と job_b を入れ替えた場合のエネルギーを返す（件数は不変）"""
+        ta, tb = self.assign[job_a], self.assign[job_b]
+        ma = self.members[ta].copy(); ma.remove(job_a); bisect.insort(ma, job_b)
+        mb = self.members[tb].copy(); mb.remove(job_b); bisect.insort(mb, job_a)
+        return self._stage([(job_a, tb), (job_b, ta)],
+                           [(ta, ma, (job_a, job_b)), (tb, mb, (job_a, job_b))], self.sum_sq)
+
+    def _stage(self, moves, trucks, new_sum_sq):
+        """変更のあるトラックだけ再ルーティングして保留状態にする（toggled: 出し入れしたジョブ）"""
+        new_dist, new_extra, new_dist_sq = self.total_dist, self.total_extra, self.dist_sq
+        changed = []
+        for t, m, toggled in trucks:
+            h = self.hashes[t]
+            for j in toggled:
+                h = self._toggle(h, j)
+            c, x = self._evaluate(t, m, h)
+            new_dist += c - self.costs[t]
+            new_extra += x - self.extras[t]
+            new_dist_sq += c * c - self.costs[t] * self.costs[t]
+            changed.append((t, m, c, x, h))
+        self._pending = (moves, changed, new_dist, new_extra, new_sum_sq, new_dist_sq)
+        return self._energy(new_dist, new_extra, new_sum_sq, new_dist_sq)
+
+    def insertion_cost(self, job, truck):
+        """まだどのトラックにも無いジョブ job を truck に加えた場合の (エネルギー増分, 新距離)"""
+        m = self.members[truck].copy()
+        bisect.insort(m, job)
+        c, x = self._evaluate(truck, m, self._toggle(self.hashes[truck], job))
+        n, old = self.counts[truck], self.costs[truck]
+        if self.objective is None:
+            pen = self._penalty_after_add(self.sum_sq + 2 * n + 1) - self.count_penalty()
+            return c - old + pen, c
+        new_E = self._energy(self.total_dist + c - old, self.total_extra + x - self.extras[truck],
+                             self.sum_sq + 2 * n + 1, self.dist_sq + c * c - old * old, self.num_jobs + 1)
+        return new_E - self.energy, c
+
+    def _penalty_after_add(self, sum_sq):
+        if not self.count_weight: return 0.0
+        mean = (self.num_jobs + 1) / self.num_trucks
+        var = max(sum_sq / self.num_trucks - mean * mean, 0.0)
+        return np.sqrt(var) * self.count_weight
+
+    def add_job(self, job, truck):
+        """新しいジョブ（番号は num_jobs と一致すること）を truck に追加して確定する"""
+        assert job == self.num_jobs
+        m = self.members[truck].copy()
+        bisect.insort(m, job)
+        h = self._toggle(self.hashes[truck], job)
+        c, x = self._evaluate(truck, m, h)
+        self.assign = np.append(self.assign, truck)
+        self.num_jobs += 1
+        self.members[truck], self.hashes[truck] = m, h
+        self.total_dist += c - self.costs[truck]
+        self.total_extra += x - self.extras[truck]
+        self.dist_sq += c * c - self.costs[truck] * self.costs[truck]
+        self.costs[truck], self.extras[truck] = c, x
+        self.sum_sq += 2 * self.counts[truck] + 1
+        self.counts[truck] += 1
+
+    def accept(self):
+        """直前の propose / propose_swap を確定する"""
+        moves, changed, new_dist, new_extra, new_sum_sq, new_dist_sq = self._pending
+        for job, t in moves:
+            self.assign[job] = t
+        for t, m, c, x, h in changed:
+            self.members[t], self.costs[t], self.extras[t], self.counts[t], self.hashes[t] = m, c, x, len(m), h
+        self.total_dist, self.total_extra = new_dist, new_extra
+        self.sum_sq, self.dist_sq = new_sum_sq, new_dist_sq
+        self._pending = None
+
+# =================================================================
+# アニーリング探索（差分評価版）
+# =================================================================
+def metropolis_step(engine, rng, num_jobs, num_trucks, curr_E, T):
+    """
+    焼きなましの1試行。ジョブを1件選んで別トラックへの積み替えを評価し、Metropolis 基準で採否を決める
+    （採択なら engine.accept() まで行う）。戻り値は (new_E, 採択したか)。同じトラックを引いたら (None, False)。
+    anneal / iter_anneal / vrp_profile.AnnealProfiler が共有するので、乱数の引き方（randint 2回＋rand 1回）はここで決まる
+    """
+    idx = rng.randint(num_jobs)
+    old, new = engine.assign[idx], rng.randint(num_trucks)
+    if old == new:
+        return None, False
+    new_E = engine.propose(idx, new)
+    if new_E < curr_E or rng.rand() < math.exp(-(new_E - curr_E) / T):
+        engine.accept()
+        return new_E, True
+    return new_E, False
+
+def anneal(route_fn, num_trucks, num_jobs, iterations=15000, T0=100.0, cooling=0.9995,
+           count_weight=0.0, init=None, rng=None, stats=None, cache=None, profiler=None,
+           objective=None):
+    """
+    1件ずつ別トラックへ積み替える近傍で焼きなましを行う。
+    1回の試行で再計算するのは移動元・移動先の2台のルートのみ。
+    rng: randint / rand を持つ乱数源（vrp_rng.BlockRNG / np.random.RandomState）。省略時は np.random のグローバル状態
+         内側ループは1回につき randint 2回＋rand 1回を引くので、BlockRNG（まとめ引き）を渡すと速い
+    stats: dict を渡すと試行数・採択数・最終温度・最終状態を書き込む
+    cache: RouteCache（同じジョブ集合のルートを再計算しない）
+    objective: DispatchObjective（車両ごとの容量・時間枠・勤務時間・平準化。IncrementalEnergy 参照）
+    profiler: vrp_profile.AnnealProfiler を渡すと計測つきのループで同じ探索を行う
+              （渡さなければ下のループは計測コードを一切通らない）
+    """
+    if profiler is not None:
+        return profiler.anneal(route_fn, num_trucks, num_jobs, iterations=iterations, T0=T0,
+                               cooling=cooling, count_weight=count_weight, init=init, rng=rng,
+                               stats=stats, cache=cache, objective=objective)
+    if rng is None:
+        rng = np.random
+    if init is None:
+        init = rng.randint(0, num_trucks, num_jobs)
+    engine = IncrementalEnergy(route_fn, num_trucks, init, count_weight, cache=cache, objective=objective)
+    curr_E = engine.energy
+    best_assign, best_E = engine.assign.copy(), curr_E
+    T = T0
+    n_moves = n_accepted = 0
+    for _ in range(iterations):
+        new_E, ok = metropolis_step(engine, rng, num_jobs, num_trucks, curr_E, T)
+        if new_E is None: continue
+        n_moves += 1
+        if ok:
+            n_accepted += 1
+            curr_E = new_E
+            if curr_E < best_E: best_E, best_assign = curr_E, engine.assign.copy()
+        T *= cooling
+    if stats is not None:
+        stats.update(moves=n_moves, accepted=n_accepted, final_T=T,
+                     final_assign=engine.assign.copy(), final_E=curr_E)
+    return best_assign, best_E
+
+# =================================================================
+# 時間制限つき（anytime）アニーリング
+# =================================================================
+def iter_anneal(route_fn, num_trucks, num_jobs, time_budget=None, max_iterations=None,
+                patience=None, T0=100.0, cooling=0.9995, schedule="geometric",
+                target_accept=0.4, window=200, report_every=1000, count_weight=0.0,
+                init=None, rng=None, cache=None, objective=None):
+    """
+    途中経過を返しながら進む焼きなまし（ジェネレータ）。
+    report_every 回ごとに {iteration, elapsed, T, current_E, best_E, acceptance_rate} を yield し、
+    停止時には stop_reason と best_assign を加えた最後のスナップショットを yield する。
+    途中のスナップショットに対して send(True) すると、その時点の最良解で停止する。
+
+    停止条件（いずれか）:
+      time_budget 秒を超えた / max_iterations 回に達した / patience 回の試行で最良が更新されない
+    schedule:
+      "geometric" … 従来どおり試行ごとに T *= cooling
+      "adaptive"  … window 回ごとに採択率を測り、目標採択率（進捗 f に応じて target_accept から
+                     0 へ下がる）に近づくよう T を調整する。time_budget か max_iterations が必要
+    objective: DispatchObjective（車両ごとの容量・時間枠・勤務時間・平準化。IncrementalEnergy 参照）
+    """
+    if schedule == "adaptive" and time_budget is None and max_iterations is None:
+        raise ValueError("adaptive schedule needs time_budget or max_iterations")
+    if time_budget is None and max_iterations is None and patience is None:
+        raise ValueError("no stopping criterion: give time_budget, max_iterations or patience")
+    if rng is None:
+        rng = np.random
+    if init is None:
+        init = rng.randint(0, num_trucks, num_jobs)
+    engine = IncrementalEnergy(route_fn, num_trucks, init, count_weight, cache=cache, objective=objective)
+    curr_E = engine.energy
+    best_assign, best_E = engine.assign.copy(), curr_E
+    T = T0
+    t_start = time.perf_counter()
+    elapsed = 0.0
+    it = last_best = 0
+    moves = accepted = win_moves = win_accepted = 0
+    stop_reason = None
+
+    def snapshot():
+        return {"iteration": it, "elapsed": elapsed, "T": T, "current_E": curr_E, "best_E": best_E,
+                "acceptance_rate": accepted / moves if moves else 0.0}
+
+    while True:
+        # 時間の確認は64回に1回（perf_counter の呼び出しも積もると無視できない）
+        if it % 64 == 0:
+            elapsed = time.perf_counter() - t_start
+            if time_budget is not None and elapsed >= time_budget: stop_reason = "time"
+        if max_iterations is not None and it >= max_iterations: stop_reason = "iterations"
+        if patience is not None and it - last_best >= patience: stop_reason = "stalled"
+        if stop_reason: break
+
+        it += 1
+        new_E, ok = metropolis_step(engine, rng, num_jobs, num_trucks, curr_E, T)
+        if new_E is not None:
+            moves += 1; win_moves += 1
+            if ok:
+                accepted += 1; win_accepted += 1
+                curr_E = new_E
+                if curr_E < best_E:
+                    best_E, best_assign, last_best = curr_E, engine.assign.copy(), it
+            if schedule == "geometric":
+                T *= cooling
+            elif win_moves >= window:
+                if time_budget is not None:
+                    f = min((time.perf_counter() - t_start) / time_budget, 1.0)
+                else:
+                    f = it / max_iterations
+                target = target_accept * (1.0 - f) ** 2
+                # 採択率が目標より高ければ冷やし、低ければ温める（差に比例した対数ステップ）
+                T *= np.exp(2.0 * (target - win_accepted / win_moves))
+                win_moves = win_accepted = 0
+        if it % report_every == 0:
+            elapsed = time.perf_counter() - t_start
+            # 呼び出し側が send(True) したら、ほかの停止条件で上書きされないようすぐ打ち切る
+            if (yield snapshot()):
+                stop_reason = "callback"
+                break
+
+    elapsed = time.perf_counter() - t_start
+    final = snapshot()
+    final.update(stop_reason=stop_reason, best_assign=best_assign)
+    yield final
+
+def anneal_anytime(route_fn, num_trucks, num_jobs, callback=None, **kwargs):
+    """
+    iter_anneal を最後まで回して (最良の割当, 最良エネルギー, 最後のスナップショット) を返す。
+    callback(snapshot) が True を返したらその時点の最良解で打ち切る（オペレーターの中断など）。
+    """
+    gen = iter_anneal(route_fn, num_trucks, num_jobs, **kwargs)
+    snap = next(gen)
+    while "stop_reason" not in snap:
+        stop = callback is not None and bool(callback(snap))
+        snap = gen.send(stop)
+    gen.close()
+    return snap["best_assign"], snap["best_E"], snap
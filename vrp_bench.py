@@ -0,0 +1,141 @@
+"""
+配車最適化エンジンのベンチマーク。
+
+問題規模（ジョブ数・トラック数・地点数）ごとに乱数シード固定のインスタンスを作り、
+  - compute_energy（全トラック再計算）
+  - 1台分のルート構築（mixed_load / sorted_pickup）
+  - 焼きなまし（差分評価）の反復速度と「経過時間 vs 最良エネルギー」
+  - ピークメモリ（tracemalloc）
+を計測して JSON に書き出す。tracemalloc は実行を数倍遅くするので、時間の計測は追跡なしで行い、
+ピークメモリは別の追跡付きの実行（インスタンス生成・全再計算・短い焼きなまし）で測る。
+
+    python vrp_bench.py --out bench_vrp.json
+    python vrp_bench.py --quick
+"""
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from functools import partial
+import numpy as np
+from vrp_anneal import anneal
+from vrp_model import from_coords
+from vrp_route import compute_energy, route_cost, sorted_pickup_cost, truck_members
+
+# (ジョブ数, トラック数, 地点数)
+DEFAULT_SCALES = [(100, 10, 5), (1000, 50, 20), (5000, 100, 50), (20000, 250, 200), (50000, 500, 1000)]
+QUICK_SCALES = [(100, 10, 5), (1000, 50, 20)]
+HEURISTICS = {"mixed_load": route_cost, "sorted_pickup": sorted_pickup_cost}
+
+def random_instance(num_jobs, num_locations, truck_cap=5, seed=0):
+    """一辺100kmの正方形に地点をばらまき、直線距離（小数第1位で丸め）で問題を作る"""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0.0, 100.0, (num_locations, 2))
+    pickup = rng.integers(0, num_locations, num_jobs)
+    drop = (pickup + rng.integers(1, num_locations, num_jobs)) % num_locations
+    size = rng.integers(1, 4, num_jobs)
+    problem = from_coords(xy, pickup, drop, size, truck_cap, depot=0, compact=False)
+    problem.dist = np.round(problem.dist, 1)
+    return problem
+
+def _best_of(fn, repeat):
+    """repeat 回実行した中の最短時間（秒）"""
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
+
+def bench_anneal(problem, num_trucks, route, iterations, segments, seed):
+    """
+    焼きなましを segments 区間に分けて続けて回し、各区間終了時の (経過秒, 最良E) を記録する。
+    区間の境目では最終状態と温度を引き継ぐので、1本の連続した探索と同じになる。
+    """
+    rng = np.random.RandomState(seed)
+    route_fn = partial(route, problem)
+    init, T, elapsed = None, 100.0, 0.0
+    best_E, trace, moves = np.inf, [], 0
+    per_seg = max(iterations // segments, 1)
+    for _ in range(segments):
+        stats = {}
+        t0 = time.perf_counter()
+        _, E = anneal(route_fn, num_trucks, problem.num_jobs, iterations=per_seg, T0=T,
+                      init=init, rng=rng, stats=stats)
+        elapsed += time.perf_counter() - t0
+        init, T, moves = stats["final_assign"], stats["final_T"], moves + per_seg
+        best_E = min(best_E, E)
+        trace.append({"seconds": elapsed, "iterations": moves, "best_E": float(best_E)})
+    return {"iterations": moves, "seconds": elapsed, "iter_per_sec": moves / elapsed,
+            "best_E": float(best_E), "trace": trace}
+
+def peak_memory(num_jobs, num_trucks, num_locations, iterations, seed):
+    """インスタンス生成・compute_energy・焼きなまし（iterations 回）を追跡付きで回したピークメモリ（MB）"""
+    tracemalloc.start()
+    try:
+        problem = random_instance(num_jobs, num_locations, seed=seed)
+        assign = np.random.default_rng(seed).integers(0, num_trucks, num_jobs)
+        for route in HEURISTICS.values():
+            compute_energy(problem, assign, num_trucks, route_fn=route)
+            anneal(partial(route, problem), num_trucks, num_jobs, iterations=iterations,
+                   rng=np.random.RandomState(seed))
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+def bench_case(num_jobs, num_trucks, num_locations, iterations, segments, repeat, seed):
+    problem = random_instance(num_jobs, num_locations, seed=seed)
+    assign = np.random.default_rng(seed).integers(0, num_trucks, num_jobs)
+    members = truck_members(assign, num_trucks)
+    result = {"num_jobs": num_jobs, "num_trucks": num_trucks, "num_locations": num_locations,
+              "seed": seed, "heuristics": {}}
+    for name, route in HEURISTICS.items():
+        route(problem, members[0])  # JITコンパイルを計測から外す
+        energy_s = _best_of(lambda: compute_energy(problem, assign, num_trucks, route_fn=route), repeat)
+        route_s = _best_of(lambda: [route(problem, m) for m in members], repeat) / num_trucks
+        result["heuristics"][name] = {
+            "energy": float(compute_energy(problem, assign, num_trucks, route_fn=route)),
+            "compute_energy_ms": 1e3 * energy_s,
+            "route_us": 1e6 * route_s,
+            "anneal": bench_anneal(problem, num_trucks, route, iterations, segments, seed),
+        }
+    # 時間の計測が終わってから、別の実行でピークメモリを測る（1区間分の焼きなまし）
+    result["peak_memory_mb"] = peak_memory(num_jobs, num_trucks, num_locations,
+                                           max(iterations // segments, 1), seed)
+    return result
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--out", default="bench_vrp.json", help="結果のJSONファイル")
+    ap.add_argument("--quick", action="store_true", help="小さい規模だけ計測する")
+    ap.add_argument("--scale", action="append", metavar="JOBS,TRUCKS,LOCS",
+                    help="計測する規模（複数指定可）。例: --scale 2000,40,30")
+    ap.add_argument("--iterations", type=int, default=5000, help="焼きなましの反復回数")
+    ap.add_argument("--segments", type=int, default=10, help="最良E推移の記録点数")
+    ap.add_argument("--repeat", type=int, default=3, help="各計測の繰り返し回数（最短を採用）")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    if args.scale:
+        scales = [tuple(int(v) for v in s.split(",")) for s in args.scale]
+    else:
+        scales = QUICK_SCALES if args.quick else DEFAULT_SCALES
+    # JITコンパイル分のメモリ・時間を最初のケースに含めないよう先に1度動かしておく
+    warm = random_instance(10, 3, seed=args.seed)
+    route_cost(warm, np.arange(10))
+    results = []
+    for jobs, trucks, locs in scales:
+        r = bench_case(jobs, trucks, locs, args.iterations, args.segments, args.repeat, args.seed)
+        results.append(r)
+        for name, h in r["heuristics"].items():
+            print(f"jobs={jobs:>6} trucks={trucks:>4} locs={locs:>5} {name:<13} "
+                  f"energy {h['compute_energy_ms']:9.2f} ms | route {h['route_us']:9.1f} us | "
+                  f"anneal {h['anneal']['iter_per_sec']:9.0f} it/s best {h['anneal']['best_E']:.1f}")
+        print(f"   peak memory {r['peak_memory_mb']:.1f} MB")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"python": platform.python_version(), "numpy": np.__version__,
+                   "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=1)
+    print(f"✅ '{args.out}' に保存しました。")
+
+if __name__ == "__main__":
+    main()
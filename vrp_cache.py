@@ -0,0 +1,79 @@
+from collections import OrderedDict
+import numpy as np
+from vrp_route import mixed_load_sequence, sequence_history
+
+# =================================================================
+# ルート計算結果のLRUキャッシュ（トラックのジョブ集合ごと）
+# =================================================================
+class RouteCache:
+    """
+    トラックに割り当てたジョブ集合 → (総距離, 訪問順) を最大 maxsize 件まで保持するLRUキャッシュ。
+    キーはジョブごとの64bit乱数のXOR（Zobristハッシュ）と件数。ジョブを1件出し入れしたときの
+    ハッシュは h ^ zobrist[job] で O(1) に更新できるので、アニーリング側で差分的に保持できる。
+    ルートは常にジョブ番号の昇順で構築する（同点処理を一意にするため）。
+    sequencer: 訪問順を決める関数（既定は貪欲法。vrp_sequence の厳密解・局所探索に差し替え可）
+    """
+    def __init__(self, problem, maxsize=65536, seed=0, sequencer=mixed_load_sequence):
+        self.problem = problem
+        self.sequencer = sequencer
+        self.maxsize = maxsize
+        self._rng = np.random.default_rng(seed)
+        self.zobrist = []
+        self.extend()
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def extend(self):
+        """problem に追加されたジョブの分だけZobrist乱数を補充する"""
+        k = self.problem.num_jobs - len(self.zobrist)
+        if k > 0:
+            self.zobrist += self._rng.integers(0, 2**63, k, dtype=np.int64).tolist()
+
+    def hash_of(self, job_indices):
+        h = 0
+        for j in job_indices:
+            h ^= self.zobrist[j]
+        return h
+
+    def toggle(self, h, job):
+        """集合にジョブを加える／除くときのハッシュ更新（どちらも同じXOR）"""
+        return h ^ self.zobrist[job]
+
+    def route(self, job_indices, h=None):
+        """(訪問順のジョブ番号, 種別, 総距離) を返す。h が分かっていれば渡すとハッシュ計算を省ける"""
+        if h is None:
+            h = self.hash_of(job_indices)
+        key = (h, len(job_indices))
+        entry = self._data.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._data.move_to_end(key)
+            return entry
+        self.misses += 1
+        if len(job_indices) == 0:
+            entry = ([], [], 0)
+        else:
+            seq_jobs, seq_kinds, total = self.sequencer(self.problem, sorted(job_indices))
+            entry = (np.array(seq_jobs, dtype=np.int32), np.array(seq_kinds, dtype=np.int8), total)
+        self._data[key] = entry
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        return entry
+
+    def cost(self, job_indices, h=None):
+        return self.route(job_indices, h)[2]
+
+    def history(self, job_indices):
+        """旧 get_mixed_load_route と同じ (history, total_dist)。キャッシュにあれば再計算しない"""
+        seq_jobs, seq_kinds, total = self.route(job_indices)
+        return sequence_history(self.problem, seq_jobs, seq_kinds), total
+
+    def stats(self):
+        n = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / n if n else 0.0,
+                "size": len(self._data), "maxsize": self.maxsize}
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
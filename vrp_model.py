@@ -0,0 +1,138 @@
+import numpy as np
+
+# =================================================================
+# 配送問題モデル（整数インデックス・配列ベース）
+# =================================================================
+def _check_sizes(size):
+    # ルート構築（vrp_route の積み待ち行列の番号付け）はサイズ 1 以上を前提にしている
+    if len(size) and size.min() < 1:
+        raise ValueError(f"job size must be >= 1: {int(size.min())}")
+
+class DispatchProblem:
+    """
+    配車問題を整数IDと配列で表したモデル。
+    地点は 0..L-1 の整数、距離は L×L の密行列、
+    ジョブは pickup / drop / size の3本の整数配列（structure-of-arrays）で持つ。
+    """
+    def __init__(self, locations, dist, pickup, drop, size, truck_cap, depot=0, coords=None):
+        self.locations = list(locations)   # 地点ID → 地点名（レポート用）
+        self.coords = coords               # 地点の座標 (L, 2)。座標から作った場合のみ
+        self.dist = np.ascontiguousarray(dist)
+        self.pickup = np.ascontiguousarray(pickup, dtype=np.int32)
+        self.drop = np.ascontiguousarray(drop, dtype=np.int32)
+        self.size = np.ascontiguousarray(size, dtype=np.int32)
+        _check_sizes(self.size)
+        self.truck_cap = int(truck_cap)
+        self.depot = int(depot)
+        self._lists = None
+        self._buf = None   # extend_jobs 用の予備領域
+
+    @property
+    def num_jobs(self):
+        return len(self.pickup)
+
+    @property
+    def num_locations(self):
+        return len(self.locations)
+
+    def extend_jobs(self, pickup, drop, size):
+        """
+        ジョブを末尾に追加し、追加分のジョブ番号を返す（日中に届く依頼用）。
+        配列は容量を倍々で確保した領域のビューなので、1件ずつ追加しても償却 O(1)。
+        """
+        pickup, drop, size = (np.atleast_1d(np.asarray(x, dtype=np.int32)) for x in (pickup, drop, size))
+        _check_sizes(size)
+        n, k = self.num_jobs, len(pickup)
+        buf = self._buf
+        if buf is None or n + k > buf.shape[1]:
+            cap = max(2 * (n + k), 64)
+            new = np.empty((3, cap), dtype=np.int32)
+            new[0, :n], new[1, :n], new[2, :n] = self.pickup, self.drop, self.size
+            buf = self._buf = new
+        buf[0, n:n + k], buf[1, n:n + k], buf[2, n:n + k] = pickup, drop, size
+        self.pickup, self.drop, self.size = buf[0, :n + k], buf[1, :n + k], buf[2, :n + k]
+        self._lists = None
+        return np.arange(n, n + k)
+
+    def as_lists(self):
+        """純Python経路用に配列をリストへ変換したもの（初回のみ変換してキャッシュ）"""
+        if self._lists is None:
+            self._lists = (self.pickup.tolist(), self.drop.tolist(),
+                           self.size.tolist(), self.dist.tolist())
+        return self._lists
+
+    def job_dicts(self):
+        """旧形式（dictのリスト）に戻す。表示・デバッグ用"""
+        names = self.locations
+        return [{"id": i, "pickup": names[p], "drop": names[d], "size": int(s)}
+                for i, (p, d, s) in enumerate(zip(self.pickup, self.drop, self.size))]
+
+# =================================================================
+# 旧形式（地点名タプルのdict ＋ ジョブdictのリスト）からの変換
+# =================================================================
+def distance_matrix(locations, dist):
+    """{(地点名, 地点名): 距離} のdictを密行列へ変換する。整数距離なら int64 のまま保持"""
+    L = len(locations)
+    values = [dist[(a, b)] for a in locations for b in locations]
+    dtype = np.int64 if all(float(v).is_integer() for v in values) else np.float64
+    return np.array(values, dtype=dtype).reshape(L, L)
+
+def from_dicts(locations, dist, jobs, truck_cap, depot="中央区"):
+    """既存スクリプトの locations / dist / jobs から DispatchProblem を作る"""
+    loc_id = {name: k for k, name in enumerate(locations)}
+    pickup = np.fromiter((loc_id[j["pickup"]] for j in jobs), dtype=np.int32, count=len(jobs))
+    drop = np.fromiter((loc_id[j["drop"]] for j in jobs), dtype=np.int32, count=len(jobs))
+    size = np.fromiter((j["size"] for j in jobs), dtype=np.int32, count=len(jobs))
+    return DispatchProblem(locations, distance_matrix(locations, dist), pickup, drop, size,
+                           truck_cap, depot=loc_id[depot])
+
+def random_problem(num_jobs, locations, dist, truck_cap, depot="中央区", max_size=3, rng=None):
+    """ジョブをdictを経由せず配列で直接生成する（積み地と降ろし地は必ず異なる）"""
+    rng = np.random.default_rng(rng)
+    L = len(locations)
+    pickup = rng.integers(0, L, num_jobs)
+    drop = (pickup + rng.integers(1, L, num_jobs)) % L
+    size = rng.integers(1, max_size + 1, num_jobs)
+    D = dist if isinstance(dist, np.ndarray) else distance_matrix(locations, dist)
+    return DispatchProblem(locations, D, pickup, drop, size, truck_cap,
+                           depot=list(locations).index(depot))
+
+# =================================================================
+# 座標で与えた多数の地点からの問題生成
+# =================================================================
+def coords_distance_matrix(coords, metric="euclidean", scale=1.0, dtype=np.float64, block=512):
+    """
+    座標 (L, 2) から L×L 距離行列を作る。L×L×2 の一時配列を作らないよう行ブロックごとに計算する。
+    metric: "euclidean"（直線距離）/ "manhattan"（碁盤目の道路を想定した距離）
+    scale: 座標1単位あたりの距離（例: 緯度経度を km に直す係数や道路の迂回率）
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    L = len(coords)
+    D = np.empty((L, L), dtype=dtype)
+    for lo in range(0, L, block):
+        diff = np.abs(coords[lo:lo + block, None, :] - coords[None, :, :])
+        if metric == "euclidean":
+            D[lo:lo + block] = np.hypot(diff[..., 0], diff[..., 1]) * scale
+        elif metric == "manhattan":
+            D[lo:lo + block] = diff.sum(axis=-1) * scale
+        else:
+            raise ValueError(f"unknown metric: {metric}")
+    return D
+
+def from_coords(coords, pickup, drop, size, truck_cap, depot=0, names=None, metric="euclidean",
+                scale=1.0, dtype=np.float64, compact=True):
+    """
+    地点座標とジョブ配列（地点は coords の行番号）から DispatchProblem を作る。
+    compact=True なら、拠点とジョブに実際に登場する地点だけに番号を振り直してから距離行列を作る
+    （数千地点の候補があっても、その日に使う地点の分だけの行列で済む）。
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    pickup, drop = np.asarray(pickup), np.asarray(drop)
+    if names is None:
+        names = [f"L{k}" for k in range(len(coords))]
+    if compact:
+        used, inv = np.unique(np.concatenate([[depot], pickup, drop]), return_inverse=True)
+        depot, pickup, drop = inv[0], inv[1:1 + len(pickup)], inv[1 + len(pickup):]
+        coords, names = coords[used], [names[k] for k in used]
+    D = coords_distance_matrix(coords, metric=metric, scale=scale, dtype=dtype)
+    return DispatchProblem(names, D, pickup, drop, size, truck_cap, depot=depot, coords=coords)
@@ -0,0 +1,184 @@
+from functools import partial
+import numpy as np
+from vrp_route import njit, route_cost, truck_members, mixed_load_sequence, _route_kernel
+
+# =================================================================
+# 近傍の一括評価（積み替え・入れ替えを K 件まとめて採点）
+# =================================================================
+# 候補手の表現: (mv_a, mv_b, mv_t) の3本の整数配列
+#   積み替え: ジョブ mv_a をトラック mv_t へ（mv_b = -1）
+#   入れ替え: ジョブ mv_a とジョブ mv_b を交換（mv_t は未使用）
+
+def sample_moves(rng, assignment, num_trucks, k, swap_ratio=0.5):
+    """積み替えと入れ替えを合わせて k 件ランダムに作る（同じトラック内の手も含む→評価で除外）"""
+    n = len(assignment)
+    mv_a = rng.integers(0, n, k)
+    mv_t = rng.integers(0, num_trucks, k)
+    mv_b = np.where(rng.random(k) < swap_ratio, rng.integers(0, n, k), -1)
+    return mv_a, mv_b, mv_t
+
+def all_relocations(assignment, num_trucks):
+    """全ジョブ × 全トラックの積み替え候補（現在のトラックへの手は除く）"""
+    assignment = np.asarray(assignment)
+    a, t = np.divmod(np.arange(len(assignment) * num_trucks), num_trucks)
+    keep = assignment[a] != t
+    return a[keep], np.full(keep.sum(), -1), t[keep]
+
+def _edit_members(order, lo, hi, remove, add, buf):
+    """昇順の order[lo:hi] から remove を除き add を挿入した昇順列を buf に書き、長さを返す"""
+    n = 0
+    inserted = add < 0
+    for k in range(lo, hi):
+        j = order[k]
+        if j == remove:
+            continue
+        if not inserted and add < j:
+            buf[n] = add
+            n += 1
+            inserted = True
+        buf[n] = j
+        n += 1
+    if not inserted:
+        buf[n] = add
+        n += 1
+    return n
+
+def _eval_moves_kernel(pickup, drop, size, dist, cap, depot, assign, order, offsets,
+                       truck_cost, mv_a, mv_b, mv_t, out):
+    """各候補手の走行距離の変化量を out に書く。同じトラック内の手は +inf"""
+    max_len = 1
+    for t in range(len(offsets) - 1):
+        max_len = max(max_len, offsets[t + 1] - offsets[t] + 1)
+    buf = np.empty(max_len, dtype=np.int64)
+    seq_j = np.empty(2 * max_len, dtype=np.int64)
+    seq_k = np.empty(2 * max_len, dtype=np.int8)
+    for m in range(len(mv_a)):
+        a, b = mv_a[m], mv_b[m]
+        ta = assign[a]
+        tb = mv_t[m] if b < 0 else assign[b]
+        if ta == tb:
+            out[m] = np.inf
+            continue
+        # 移動元: a を除き（入れ替えなら b を加え）、移動先: b を除き a を加える
+        n = _edit_members(order, offsets[ta], offsets[ta + 1], a, b, buf)
+        ca, _ = _route_kernel(pickup, drop, size, dist, buf[:n], cap, depot, seq_j, seq_k)
+        if n == 0:
+            ca = dist[depot, depot] * 0
+        n = _edit_members(order, offsets[tb], offsets[tb + 1], b, a, buf)
+        cb, _ = _route_kernel(pickup, drop, size, dist, buf[:n], cap, depot, seq_j, seq_k)
+        out[m] = (ca + cb) - (truck_cost[ta] + truck_cost[tb])
+
+if njit is not None:
+    _edit_members = njit(cache=True)(_edit_members)
+    _eval_moves_kernel = njit(cache=True)(_eval_moves_kernel)
+
+def _greedy_routes(problem, engine):
+    """engine のルート距離がカーネルと同じ貪欲ルートか（キャッシュの sequencer か route_fn で判定）"""
+    if engine.cache is not None:
+        return engine.cache.sequencer is mixed_load_sequence
+    fn = engine.route_fn
+    # lambda などは中身を確かめられないので貪欲ルートとはみなさない
+    return (isinstance(fn, partial) and fn.func is route_cost and len(fn.args) == 1
+            and fn.args[0] is problem and not fn.keywords)
+
+def evaluate_moves(problem, engine, mv_a, mv_b, mv_t):
+    """
+    IncrementalEnergy の現在状態に対し、候補手それぞれのエネルギー変化量を一括で返す。
+    距離の変化はコンパイル済みカーネルで一度に計算し、件数ばらつき項はベクトル演算で足す。
+    カーネルは貪欲ルート（mixed_load_sequence）で組み直すので、使えるのは engine の距離も
+    同じ貪欲ルートのとき（キャッシュの sequencer が mixed_load_sequence、キャッシュ無しなら
+    route_fn が partial(route_cost, problem)）だけ。
+    engine が objective（車両ごとの容量・時間枠など）を持つ場合や、それ以外のルート
+    （厳密解・局所探索・sorted_pickup_cost・lambda など）の場合は、engine.costs と同じ基準に
+    するため1手ずつ engine.propose で評価する。
+    """
+    assign = engine.assign
+    mv_a, mv_b, mv_t = (np.asarray(x, dtype=np.int64) for x in (mv_a, mv_b, mv_t))
+    if engine.objective is not None or not _greedy_routes(problem, engine):
+        E = engine.energy
+        out = np.full(len(mv_a), np.inf)
+        for m, (a, b, t) in enumerate(zip(mv_a.tolist(), mv_b.tolist(), mv_t.tolist())):
+            tb = t if b < 0 else assign[b]
+            if assign[a] == tb: continue
+            out[m] = (engine.propose(a, t) if b < 0 else engine.propose_swap(a, b)) - E
+        engine._pending = None
+        return out
+    costs = np.asarray(engine.costs, dtype=np.float64)
+    out = np.empty(len(mv_a), dtype=np.float64)
+    if njit is not None:
+        members = truck_members(assign, engine.num_trucks)
+        offsets = np.zeros(engine.num_trucks + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(m) for m in members])
+        order = np.concatenate(members).astype(np.int64)
+        _eval_moves_kernel(problem.pickup, problem.drop, problem.size, problem.dist,
+                           problem.truck_cap, problem.depot, assign.astype(np.int64), order,
+                           offsets, costs, mv_a, mv_b, mv_t, out)
+    else:
+        for m, (a, b, t) in enumerate(zip(mv_a, mv_b, mv_t)):
+            ta = assign[a]; tb = t if b < 0 else assign[b]
+            if ta == tb: out[m] = np.inf; continue
+            ma = [j for j in engine.members[ta] if j != a] + ([b] if b >= 0 else [])
+            mb = [j for j in engine.members[tb] if j != b] + [a]
+            out[m] = (route_cost(problem, sorted(ma)) + route_cost(problem, sorted(mb))
+                      - costs[ta] - costs[tb])
+
+    if engine.count_weight:
+        # 件数が変わるのは積み替えのみ（入れ替えは件数不変）
+        counts = np.asarray(engine.counts)
+        reloc = mv_b < 0
+        n_src = counts[assign[mv_a]]
+        n_dst = counts[np.where(reloc, mv_t, assign[np.maximum(mv_b, 0)])]
+        new_sum_sq = engine.sum_sq + np.where(reloc, 2 * (n_dst - n_src) + 2, 0)
+        mean = engine.num_jobs / engine.num_trucks
+        new_pen = np.sqrt(np.maximum(new_sum_sq / engine.num_trucks - mean * mean, 0.0)) * engine.count_weight
+        out += new_pen - engine.count_penalty()
+    return out
+
+def apply_move(engine, a, b, t, tol=1e-9):
+    """
+    評価済みの候補手を engine で評価し直し、エネルギーが実際に下がる場合だけ確定させる。
+    戻り値: (新しいエネルギー, 確定したか)。確定しなかった場合は元のエネルギーのまま
+    """
+    E0 = engine.energy
+    E = engine.propose(a, t) if b < 0 else engine.propose_swap(a, b)
+    if not E < E0 - tol:
+        engine._pending = None
+        return E0, False
+    engine.accept()
+    return E, True
+
+def metropolis_pick(deltas, T, rng):
+    """変化量 deltas から exp(-Δ/T) に比例する確率で1手を選ぶ（熱浴法）。選べる手が無ければ -1"""
+    ok = np.isfinite(deltas)
+    if not ok.any(): return -1
+    w = np.zeros_like(deltas)
+    d = deltas[ok]
+    w[ok] = np.exp(-(d - d.min()) / T)
+    return int(rng.choice(len(deltas), p=w / w.sum()))
+
+def steepest_descent(problem, engine, batch=2048, max_rounds=1000, swap_ratio=0.5, rng=None):
+    """
+    焼きなまし後の仕上げ：毎ラウンド候補手をまとめて評価し、最も改善する手だけを採用する。
+    候補数が batch 以下なら全積み替え＋ランダム入れ替え、超えるならランダムに batch 件。
+    改善する手が無くなったら終了し、最終エネルギーを返す。
+    一括評価の最良手が engine の再評価で改善しなかった場合は、その手を採らずに終了する。
+    """
+    rng = np.random.default_rng(rng)
+    E = engine.energy
+    full = problem.num_jobs * engine.num_trucks <= batch
+    for _ in range(max_rounds):
+        if full:
+            a, b, t = all_relocations(engine.assign, engine.num_trucks)
+            k = max(batch - len(a), 0)
+            sa, sb, st = sample_moves(rng, engine.assign, engine.num_trucks, k, swap_ratio=1.0)
+            a, b, t = np.concatenate([a, sa]), np.concatenate([b, sb]), np.concatenate([t, st])
+        else:
+            a, b, t = sample_moves(rng, engine.assign, engine.num_trucks, batch, swap_ratio)
+        deltas = evaluate_moves(problem, engine, a, b, t)
+        m = int(np.argmin(deltas))
+        if not deltas[m] < -1e-9:
+            break
+        E, applied = apply_move(engine, a[m], b[m], t[m])
+        if not applied:
+            break
+    return E
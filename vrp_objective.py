@@ -0,0 +1,144 @@
+import copy
+import numpy as np
+from vrp_cache import RouteCache
+from vrp_route import njit, mixed_load_sequence, truck_members
+
+# =================================================================
+# 目的関数・制約の層（車両ごとの容量・勤務時間・時間枠・負荷の平準化）
+# =================================================================
+# エネルギー = 総走行距離
+#            + Σ_t 車両ごとの項（未配送・時間枠の遅れ・勤務時間の超過）
+#            + 平準化の項（件数の標準偏差 × count_weight ＋ 走行距離の標準偏差 × distance_weight）
+# 車両ごとの項はその車両のルートだけで決まり、平準化の項は件数・距離の和と二乗和だけで決まる。
+# したがって IncrementalEnergy(objective=...) は積み替えのたびに変わった2台分だけ計算し直せばよい。
+
+def _schedule_kernel(seq_jobs, seq_kinds, pickup, drop, dist, depot, ready, due, speed, service, start):
+    """
+    訪問順に沿って時刻を進め、(拠点を出てから戻るまでの所要時間, 遅れの合計) を返す。
+    積み地には ready より前に着いたら待ち、降ろし地に due を過ぎて着いた分を遅れとして数える。
+    移動時間 = 距離 / speed、各停車で service だけ作業時間がかかる。
+    """
+    t = start
+    loc = depot
+    late = 0.0
+    for k in range(len(seq_jobs)):
+        j = seq_jobs[k]
+        nxt = pickup[j] if seq_kinds[k] == 0 else drop[j]
+        t += dist[loc, nxt] / speed
+        if seq_kinds[k] == 0:
+            if t < ready[j]:
+                t = ready[j]
+        elif t > due[j]:
+            late += t - due[j]
+        t += service
+        loc = nxt
+    t += dist[loc, depot] / speed
+    return t - start, late
+
+if njit is not None:
+    _schedule_kernel = njit(cache=True)(_schedule_kernel)
+
+class DispatchObjective:
+    """
+    異なる車両（容量・勤務時間）と時間枠つきジョブの評価。
+      capacities: 車両ごとの積載容量（省略時は全車 problem.truck_cap）。容量ごとにルートキャッシュを持つ
+      shift_limit: 車両ごとの勤務時間の上限（スカラーなら全車共通）。超過分 × shift_weight
+      start: 車両ごとの出発時刻
+      ready / due: ジョブごとの積み可能時刻・降ろし期限。遅れの合計 × late_weight
+      speed / service: 移動速度（距離 / 時間）と1停車あたりの作業時間
+      unserved_weight: 容量を超えて積めないジョブ1件あたりのペナルティ
+      count_weight / distance_weight: 件数・走行距離の標準偏差に掛ける係数
+    時刻の単位は speed・service と揃っていれば何でもよい（例: 距離 km、速度 km/分 なら分）。
+    時間枠も勤務時間も指定しなければ時刻の計算は行わない。
+    extend_jobs で問題に追加したジョブは対象外（容量ごとに問題のコピーを持つため）。
+    """
+    def __init__(self, problem, num_trucks, capacities=None, shift_limit=None, start=0.0,
+                 ready=None, due=None, speed=1.0, service=0.0, count_weight=0.0, distance_weight=0.0,
+                 shift_weight=1.0, late_weight=1.0, unserved_weight=1000.0,
+                 cache_size=65536, seed=0, sequencer=mixed_load_sequence):
+        self.problem = problem
+        self.num_trucks = num_trucks
+        T, n = num_trucks, problem.num_jobs
+        self.capacities = (np.full(T, problem.truck_cap, dtype=np.int64) if capacities is None
+                           else np.asarray(capacities, dtype=np.int64))
+        self.shift_limit = None if shift_limit is None else \
+            np.broadcast_to(np.asarray(shift_limit, dtype=np.float64), (T,)).copy()
+        self.start = np.broadcast_to(np.asarray(start, dtype=np.float64), (T,)).copy()
+        self.timed = shift_limit is not None or ready is not None or due is not None
+        self.ready = np.zeros(n) if ready is None else np.asarray(ready, dtype=np.float64)
+        self.due = np.full(n, np.inf) if due is None else np.asarray(due, dtype=np.float64)
+        self.speed, self.service = float(speed), float(service)
+        self.count_weight, self.distance_weight = count_weight, distance_weight
+        self.shift_weight, self.late_weight = shift_weight, late_weight
+        self.unserved_weight = unserved_weight
+
+        # 容量ごとに truck_cap だけ差し替えた問題のコピー（配列は共有）とルートキャッシュを用意する。
+        # Zobrist 乱数表は全キャッシュで共有し、トラックのハッシュをどのキャッシュでも使えるようにする
+        self.caches = {}
+        for cap in np.unique(self.capacities).tolist():
+            view = copy.copy(problem)
+            view.truck_cap, view._lists = cap, None
+            cache = RouteCache(view, maxsize=cache_size, seed=seed, sequencer=sequencer)
+            if self.caches:
+                cache.zobrist = next(iter(self.caches.values())).zobrist
+            self.caches[cap] = cache
+        self._cache_of = [self.caches[c] for c in self.capacities.tolist()]
+        self._hasher = self._cache_of[0] if T else None
+
+    def hash_of(self, job_indices):
+        return self._hasher.hash_of(job_indices)
+
+    def toggle(self, h, job):
+        return self._hasher.toggle(h, job)
+
+    def route(self, t, job_indices, h=None):
+        """トラック t（の容量）での (訪問順のジョブ番号, 種別, 総距離)"""
+        return self._cache_of[t].route(job_indices, h)
+
+    def truck_terms(self, t, seq_jobs, seq_kinds, n_jobs, total):
+        """トラック t の項を (未配送件数, 遅れ, 勤務時間, 勤務時間の超過) で返す"""
+        unserved = n_jobs - len(seq_jobs) // 2
+        if not self.timed or len(seq_jobs) == 0:
+            return unserved, 0.0, 0.0, 0.0
+        p = self.problem
+        duration, late = _schedule_kernel(seq_jobs, seq_kinds, p.pickup, p.drop, p.dist, p.depot,
+                                          self.ready, self.due, self.speed, self.service, self.start[t])
+        over = 0.0 if self.shift_limit is None else max(duration - self.shift_limit[t], 0.0)
+        return unserved, late, duration, over
+
+    def evaluate(self, t, job_indices, h=None):
+        """トラック t にジョブ集合 job_indices を割り当てたときの (走行距離, 車両ごとの項)"""
+        seq_jobs, seq_kinds, total = self._cache_of[t].route(job_indices, h)
+        unserved, late, _, over = self.truck_terms(t, seq_jobs, seq_kinds, len(job_indices), total)
+        return total, unserved * self.unserved_weight + late * self.late_weight + over * self.shift_weight
+
+    def balance_penalty(self, num_jobs, count_sq, dist_sum, dist_sq):
+        """件数・走行距離の標準偏差ペナルティ（和と二乗和から O(1)）"""
+        T = self.num_trucks
+        pen = 0.0
+        if self.count_weight:
+            mean = num_jobs / T
+            pen += np.sqrt(max(count_sq / T - mean * mean, 0.0)) * self.count_weight
+        if self.distance_weight:
+            mean = dist_sum / T
+            pen += np.sqrt(max(dist_sq / T - mean * mean, 0.0)) * self.distance_weight
+        return pen
+
+    def breakdown(self, assignment):
+        """割当全体を一から評価し、項目ごとの内訳を返す（レポート・検算用）"""
+        members = truck_members(np.asarray(assignment), self.num_trucks)
+        dists, counts = np.zeros(self.num_trucks), np.array([len(m) for m in members])
+        unserved = late = over = 0.0
+        durations = np.zeros(self.num_trucks)
+        for t, m in enumerate(members):
+            seq_jobs, seq_kinds, total = self.route(t, m.tolist())
+            u, l, d, o = self.truck_terms(t, seq_jobs, seq_kinds, len(m), total)
+            dists[t], durations[t] = total, d
+            unserved += u; late += l; over += o
+        balance = self.balance_penalty(len(assignment), (counts ** 2).sum(), dists.sum(), (dists ** 2).sum())
+        energy = (dists.sum() + unserved * self.unserved_weight + late * self.late_weight
+                  + over * self.shift_weight + balance)
+        return {"energy": float(energy), "distance": float(dists.sum()), "unserved": int(unserved),
+                "late": float(late), "shift_over": float(over), "balance": float(balance),
+                "count_std": float(counts.std()), "distance_std": float(dists.std()),
+                "truck_distance": dists.tolist(), "truck_duration": durations.tolist()}
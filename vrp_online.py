@@ -0,0 +1,91 @@
+import time
+import numpy as np
+from vrp_anneal import IncrementalEnergy
+from vrp_cache import RouteCache
+
+# =================================================================
+# 逐次配車（日中に届く依頼を現在の計画へ差し込む）
+# =================================================================
+class OnlineDispatcher:
+    """
+    計画済みの割当を保持したまま、新しい依頼を1件ずつ（または少数まとめて）受け付ける。
+      1. 最良挿入：全トラックについて「そのトラックに加えたときの増分」を求め、最小のトラックへ入れる
+      2. 局所焼きなまし：挿入先と増分が小さかった次点のトラックだけを対象に、
+         現在の計画から短い焼きなましをかける（全体を最初から解き直さない）
+    """
+    def __init__(self, problem, num_trucks, assignment=None, count_weight=0.0,
+                 neighbors=3, iterations=200, T0=5.0, cooling=0.98, cache_size=65536, seed=0):
+        self.problem = problem
+        self.num_trucks = num_trucks
+        self.neighbors = neighbors
+        self.iterations = iterations
+        self.T0, self.cooling = T0, cooling
+        self.rng = np.random.default_rng(seed)
+        self.cache = RouteCache(problem, maxsize=cache_size, seed=seed)
+        if assignment is None:
+            assignment = np.zeros(0, dtype=np.int64) if problem.num_jobs == 0 else \
+                self.rng.integers(0, num_trucks, problem.num_jobs)
+        self.engine = IncrementalEnergy(None, num_trucks, assignment, count_weight, cache=self.cache)
+        self.latencies = []
+
+    @property
+    def assignment(self):
+        return self.engine.assign
+
+    @property
+    def energy(self):
+        return self.engine.energy
+
+    def add_job(self, pickup, drop, size):
+        """依頼を1件受け付け、割り当てたトラック番号を返す"""
+        return int(self.add_jobs([pickup], [drop], [size])[0])
+
+    def add_jobs(self, pickups, drops, sizes):
+        """依頼をまとめて受け付け、それぞれの割当トラックを返す"""
+        t0 = time.perf_counter()
+        new_ids = self.problem.extend_jobs(pickups, drops, sizes)
+        self.cache.extend()
+        affected = set()
+        for job in new_ids:
+            deltas = np.array([self.engine.insertion_cost(job, t)[0] for t in range(self.num_trucks)])
+            ranked = np.argsort(deltas, kind="stable")
+            self.engine.add_job(job, int(ranked[0]))
+            affected.update(int(t) for t in ranked[:self.neighbors + 1])
+        self._local_anneal(sorted(affected))
+        self.latencies.append(time.perf_counter() - t0)
+        return self.engine.assign[new_ids]
+
+    def _local_anneal(self, trucks):
+        """trucks に含まれるジョブを trucks の間でだけ積み替える短い焼きなまし（最良状態で終える）"""
+        eng, rng = self.engine, self.rng
+        jobs = [j for t in trucks for j in eng.members[t]]
+        if len(trucks) < 2 or not jobs: return
+        curr_E = best_E = eng.energy
+        best = {j: eng.assign[j] for j in jobs}
+        T = self.T0
+        picks = rng.integers(0, len(jobs), self.iterations)
+        targets = rng.integers(0, len(trucks), self.iterations)
+        uniforms = rng.random(self.iterations)
+        for k in range(self.iterations):
+            job, new = jobs[picks[k]], trucks[targets[k]]
+            if eng.assign[job] == new: continue
+            new_E = eng.propose(job, new)
+            if new_E < curr_E or uniforms[k] < np.exp(-(new_E - curr_E) / T):
+                eng.accept()
+                curr_E = new_E
+                if curr_E < best_E:
+                    best_E = curr_E
+                    best = {j: eng.assign[j] for j in jobs}
+            T *= self.cooling
+        # 最後の状態が最良でなければ最良の割当へ戻す（変わったジョブだけ積み替え直す）
+        for j, t in best.items():
+            if eng.assign[j] != t:
+                eng.propose(j, t)
+                eng.accept()
+
+    def stats(self):
+        lat = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {"jobs": self.problem.num_jobs, "energy": float(self.energy),
+                "latency_mean_ms": float(1e3 * lat.mean()),
+                "latency_p95_ms": float(1e3 * np.percentile(lat, 95)),
+                "latency_max_ms": float(1e3 * lat.max()), "cache": self.cache.stats()}
@@ -0,0 +1,104 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from vrp_anneal import anneal
+from vrp_route import route_cost
+from vrp_rng import stream
+
+# =================================================================
+# 並列アニーリング（マルチスタート / レプリカ交換）
+# =================================================================
+# ワーカープロセスごとに1回だけ問題データを受け取り、以後の投入では送らない
+_WORKER = {}
+
+def _init_worker(problem, num_trucks, count_weight, bit_generator="pcg64"):
+    _WORKER.update(problem=problem, num_trucks=num_trucks, count_weight=count_weight,
+                   route_fn=partial(route_cost, problem), bit_generator=bit_generator)
+
+def chain_rng(seed, *key, bit_generator="pcg64"):
+    """
+    seed と (チェーン番号, ラウンド番号 …) から独立で再現可能な乱数源を作る（vrp_rng.stream）。
+    既定は PCG64 のまとめ引き。bit_generator="mt19937" で従来の RandomState に戻る
+    """
+    return stream(seed, *key, bit_generator=bit_generator)
+
+def _run_chain(chain_id, seed_key, iterations, T0, cooling, init):
+    w = _WORKER
+    stats = {}
+    t0 = time.perf_counter()
+    best_assign, best_E = anneal(w["route_fn"], w["num_trucks"], w["problem"].num_jobs,
+                                 iterations=iterations, T0=T0, cooling=cooling,
+                                 count_weight=w["count_weight"], init=init,
+                                 rng=chain_rng(*seed_key, bit_generator=w["bit_generator"]),
+                                 stats=stats)
+    stats.update(chain=chain_id, best_E=best_E, best_assign=best_assign, T0=T0,
+                 elapsed=time.perf_counter() - t0)
+    return stats
+
+def _summary(stats):
+    """チェーン統計から配列（最終状態・最良解）を除いた表示用のdict"""
+    return {k: v for k, v in stats.items() if k not in ("final_assign", "best_assign")}
+
+def multistart_anneal(problem, num_trucks, num_chains=8, iterations=15000, T0=100.0,
+                      cooling=0.9995, count_weight=0.0, seed=0, max_workers=None, bit_generator="pcg64"):
+    """
+    独立な num_chains 本の焼きなましをプロセスプールで並列実行する。
+    各チェーンの乱数は seed から SeedSequence で派生させるので、同じ seed なら結果は再現する。
+    bit_generator: "pcg64" / "philox"（まとめ引き）/ "mt19937"（従来の RandomState）
+    戻り値: (最良の割当, 最良エネルギー, チェーンごとの統計リスト)
+    """
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker,
+                             initargs=(problem, num_trucks, count_weight, bit_generator)) as pool:
+        futures = [pool.submit(_run_chain, k, (seed, k), iterations, T0, cooling, None)
+                   for k in range(num_chains)]
+        results = [f.result() for f in futures]
+    best = min(results, key=lambda r: r["best_E"])
+    return best["best_assign"], best["best_E"], [_summary(r) for r in results]
+
+def temperature_ladder(T_min, T_max, n):
+    """T_min〜T_max の等比数列（レプリカ交換用の温度列）"""
+    if n == 1: return np.array([T_min])
+    return T_min * (T_max / T_min) ** (np.arange(n) / (n - 1))
+
+def tempering_anneal(problem, num_trucks, num_replicas=8, rounds=50, sweep=300,
+                     T_min=1.0, T_max=100.0, count_weight=0.0, seed=0, max_workers=None,
+                     bit_generator="pcg64"):
+    """
+    レプリカ交換法（パラレルテンパリング）。
+    温度ごとのレプリカを sweep 回ずつ一定温度で並列に動かし、ラウンドの終わりに
+    隣接温度のレプリカ同士で状態の交換を Metropolis 判定で試みる。
+    戻り値: (最良の割当, 最良エネルギー, レプリカ（温度）ごとの統計リスト)
+    """
+    temps = temperature_ladder(T_min, T_max, num_replicas)
+    swap_rng = chain_rng(seed, num_replicas, bit_generator=bit_generator)  # 交換判定用（各レプリカとは別ストリーム）
+    states = [None] * num_replicas
+    energies = np.full(num_replicas, np.inf)
+    stats = [{"chain": k, "T0": float(temps[k]), "moves": 0, "accepted": 0, "swaps_tried": 0,
+              "swaps_accepted": 0, "best_E": np.inf, "elapsed": 0.0} for k in range(num_replicas)]
+    best_assign, best_E = None, np.inf
+
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker,
+                             initargs=(problem, num_trucks, count_weight, bit_generator)) as pool:
+        for r in range(rounds):
+            futures = [pool.submit(_run_chain, k, (seed, k, r), sweep, temps[k], 1.0, states[k])
+                       for k in range(num_replicas)]
+            for k, f in enumerate(futures):
+                res = f.result()
+                states[k], energies[k] = res["final_assign"], res["final_E"]
+                st = stats[k]
+                st["moves"] += res["moves"]; st["accepted"] += res["accepted"]
+                st["elapsed"] += res["elapsed"]
+                st["best_E"] = min(st["best_E"], res["best_E"])
+                if res["best_E"] < best_E:
+                    best_E, best_assign = res["best_E"], res["best_assign"]
+
+            # 隣接温度の交換（偶奇ラウンドで組を交互に）
+            for k in range(r % 2, num_replicas - 1, 2):
+                stats[k]["swaps_tried"] += 1
+                delta = (energies[k] - energies[k + 1]) * (1.0 / temps[k] - 1.0 / temps[k + 1])
+                if delta >= 0 or swap_rng.rand() < np.exp(delta):
+                    states[k], states[k + 1] = states[k + 1], states[k]
+                    energies[k], energies[k + 1] = energies[k + 1], energies[k]
+                    stats[k]["swaps_accepted"] += 1
+    return best_assign, best_E, stats
@@ -0,0 +1,224 @@
+import csv
+import json
+import math
+import time
+import numpy as np
+from vrp_anneal import IncrementalEnergy, metropolis_step
+
+# =================================================================
+# 焼きなましの計測（明示的に渡したときだけ動く）
+# =================================================================
+# anneal(..., profiler=AnnealProfiler()) のように渡すと、計測つきのループ（AnnealProfiler.anneal）で
+# 同じ探索を行う。渡さなければ anneal の本体ループは一切変わらないので、無効時の負担は無い。
+# 1回の試行は anneal と同じ vrp_anneal.metropolis_step を呼び、乱数源と IncrementalEnergy を
+# 計測用の包み（_TimedRNG / _TimedEngine）に替えて渡すだけなので、同じ乱数源なら同じ解になる。
+
+SECTIONS = ("rng", "propose", "route", "accept")
+
+class _TimedRNG:
+    """乱数源の randint / rand の時間を rng 区間に積む"""
+    def __init__(self, rng, seconds, calls):
+        self.rng, self.seconds, self.calls = rng, seconds, calls
+
+    def randint(self, *args):
+        t0 = time.perf_counter()
+        out = self.rng.randint(*args)
+        self.seconds["rng"] += time.perf_counter() - t0
+        self.calls["rng"] += 1
+        return out
+
+    def rand(self):
+        t0 = time.perf_counter()
+        out = self.rng.rand()
+        self.seconds["rng"] += time.perf_counter() - t0
+        self.calls["rng"] += 1
+        return out
+
+class _TimedEngine:
+    """IncrementalEnergy の propose / accept の時間を積む（ほかの属性はそのまま見せる）。
+    直前の propose の開始時刻と所要時間を t_propose / d_propose に残す"""
+    def __init__(self, engine, seconds, calls):
+        self.engine, self.seconds, self.calls = engine, seconds, calls
+        self.t_propose = self.d_propose = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    def propose(self, job, new_truck):
+        t0 = time.perf_counter()
+        out = self.engine.propose(job, new_truck)
+        self.t_propose, self.d_propose = t0, time.perf_counter() - t0
+        self.seconds["propose"] += self.d_propose
+        self.calls["propose"] += 1
+        return out
+
+    def accept(self):
+        t0 = time.perf_counter()
+        self.engine.accept()
+        self.seconds["accept"] += time.perf_counter() - t0
+        self.calls["accept"] += 1
+
+class AnnealProfiler:
+    """
+    区間ごとの時間と回数を集計する。
+      rng     … 乱数（ジョブ・トラック・採択判定）
+      propose … 候補の評価（ルート構築＋エネルギー集計。route を含む）
+      route   … ルート構築そのもの（route_fn、キャッシュ使用時はミスしたときの sequencer）
+      accept  … 確定処理
+    ほかに試行数・採択数・キャッシュのヒット／ミスと、温度帯（log10(T) を bands_per_decade 等分）ごとの採択率を数える。
+    trace=True なら試行ごとの記録も残し、CSV や Chrome trace（chrome://tracing / Perfetto）へ書き出せる。
+    """
+    def __init__(self, trace=False, bands_per_decade=4):
+        self.trace = trace
+        self.bands_per_decade = bands_per_decade
+        self.reset()
+
+    def reset(self):
+        self.seconds = dict.fromkeys(SECTIONS, 0.0)
+        self.calls = dict.fromkeys(SECTIONS, 0)
+        self.iterations = self.moves = self.accepted = 0
+        self.cache_hits = self.cache_misses = 0
+        self.total_seconds = 0.0
+        self.bands = {}      # 温度帯 → [試行数, 採択数]
+        self.rows = []       # trace=True のときの試行ごとの記録
+
+    def _band(self, T):
+        return math.floor(math.log10(T) * self.bands_per_decade) if T > 0 else -10**9
+
+    def _timed_route(self, fn):
+        """fn の呼び出し時間を route 区間に積む関数を返す"""
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            out = fn(*args, **kwargs)
+            self.seconds["route"] += time.perf_counter() - t0
+            self.calls["route"] += 1
+            return out
+        return timed
+
+    def anneal(self, route_fn, num_trucks, num_jobs, iterations=15000, T0=100.0, cooling=0.9995,
+               count_weight=0.0, init=None, rng=None, stats=None, cache=None, objective=None):
+        """vrp_anneal.anneal と同じ探索を計測しながら行う（引数・戻り値も同じ）"""
+        if rng is None:
+            rng = np.random
+        if init is None:
+            init = rng.randint(0, num_trucks, num_jobs)
+        # ルート構築の計測：キャッシュ使用時は sequencer（ミス時のみ呼ばれる）を一時的に包む
+        if cache is not None:
+            sequencer, hits0, misses0 = cache.sequencer, cache.hits, cache.misses
+            cache.sequencer = self._timed_route(sequencer)
+        else:
+            route_fn = self._timed_route(route_fn)
+        sec, bands, rows = self.seconds, self.bands, self.rows
+        timed_rng = _TimedRNG(rng, sec, self.calls)
+        clock = time.perf_counter
+        t_start = clock()
+        try:
+            engine = _TimedEngine(IncrementalEnergy(route_fn, num_trucks, init, count_weight, cache=cache,
+                                                    objective=objective), sec, self.calls)
+            curr_E = engine.energy
+            best_assign, best_E = engine.assign.copy(), curr_E
+            T = T0
+            n_moves = n_accepted = 0
+            for it in range(iterations):
+                t0 = clock()
+                route_before = sec["route"]
+                new_E, ok = metropolis_step(engine, timed_rng, num_jobs, num_trucks, curr_E, T)
+                t1 = clock()
+                if new_E is None: continue
+                n_moves += 1
+                band = bands.setdefault(self._band(T), [0, 0])
+                band[0] += 1
+                if ok:
+                    n_accepted += 1
+                    band[1] += 1
+                    curr_E = new_E
+                    if curr_E < best_E: best_E, best_assign = curr_E, engine.assign.copy()
+                if self.trace:
+                    rows.append((it, t0 - t_start, t1 - t0, engine.t_propose - t_start, engine.d_propose,
+                                 sec["route"] - route_before, T, float(new_E), float(curr_E), ok))
+                T *= cooling
+        finally:
+            self.total_seconds += clock() - t_start
+            if cache is not None:
+                cache.sequencer = sequencer
+                self.cache_hits += cache.hits - hits0
+                self.cache_misses += cache.misses - misses0
+        self.iterations += iterations
+        self.moves += n_moves
+        self.accepted += n_accepted
+        if stats is not None:
+            stats.update(moves=n_moves, accepted=n_accepted, final_T=T,
+                         final_assign=engine.assign.copy(), final_E=curr_E)
+        return best_assign, best_E
+
+    # ---------------------------------------------------------------
+    # 書き出し
+    # ---------------------------------------------------------------
+    def band_table(self):
+        """温度帯ごとの採択率（高温側から）"""
+        out = []
+        for b in sorted(self.bands, reverse=True):
+            n, a = self.bands[b]
+            out.append({"T_low": 10 ** (b / self.bands_per_decade),
+                        "T_high": 10 ** ((b + 1) / self.bands_per_decade),
+                        "moves": n, "accepted": a, "acceptance_rate": a / n if n else 0.0})
+        return out
+
+    def summary(self):
+        total = self.total_seconds
+        sections = {k: {"seconds": self.seconds[k], "calls": self.calls[k],
+                        "share": self.seconds[k] / total if total else 0.0} for k in SECTIONS}
+        n_cache = self.cache_hits + self.cache_misses
+        return {"iterations": self.iterations, "moves": self.moves, "accepted": self.accepted,
+                "acceptance_rate": self.accepted / self.moves if self.moves else 0.0,
+                "seconds": total, "iter_per_sec": self.iterations / total if total else 0.0,
+                "sections": sections,
+                "cache": {"hits": self.cache_hits, "misses": self.cache_misses,
+                          "hit_rate": self.cache_hits / n_cache if n_cache else 0.0},
+                "temperature_bands": self.band_table()}
+
+    def print_summary(self, f=None):
+        s = self.summary()
+        lines = [f"試行 {s['iterations']} 回 / 候補 {s['moves']} / 採択 {s['accepted']} "
+                 f"(採択率 {s['acceptance_rate']:.1%}) / {s['seconds']:.3f}秒 ({s['iter_per_sec']:.0f} it/s)"]
+        for k, v in s["sections"].items():
+            lines.append(f"  {k:<8} {1e3 * v['seconds']:10.1f} ms {v['share']:6.1%}  ({v['calls']} 回)")
+        if s["cache"]["hits"] + s["cache"]["misses"]:
+            lines.append(f"  キャッシュ: ヒット {s['cache']['hits']} / ミス {s['cache']['misses']} "
+                         f"(ヒット率 {s['cache']['hit_rate']:.1%})")
+        lines.append("  温度帯ごとの採択率:")
+        for b in s["temperature_bands"]:
+            lines.append(f"    T {b['T_low']:9.3g} 〜 {b['T_high']:9.3g}: {b['acceptance_rate']:6.1%} "
+                         f"({b['accepted']}/{b['moves']})")
+        print("\n".join(lines), file=f)
+
+    def write_json(self, f):
+        json.dump(self.summary(), f, ensure_ascii=False, indent=1)
+
+    def write_trace_csv(self, f):
+        """試行ごとの記録（trace=True で計測したもの）を CSV で書く"""
+        w = csv.writer(f)
+        w.writerow(["iteration", "t_s", "step_us", "propose_t_s", "propose_us", "route_us", "T", "new_E",
+                    "current_E", "accepted"])
+        for it, t, step, t_prop, prop, route, T, new_E, curr_E, ok in self.rows:
+            w.writerow([it, f"{t:.6f}", f"{1e6 * step:.2f}", f"{t_prop:.6f}", f"{1e6 * prop:.2f}",
+                        f"{1e6 * route:.2f}", T, new_E, curr_E, int(ok)])
+
+    def write_chrome_trace(self, f):
+        """
+        Chrome trace 形式（Trace Event Format の JSON）。試行ごとに step / propose の区間と、
+        温度・現在のエネルギーのカウンタを出す。1行ずつ書くので試行数が多くても文字列を溜めない。
+        """
+        f.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+        first = True
+        for it, t, step, t_prop, prop, route, T, new_E, curr_E, ok in self.rows:
+            ts = 1e6 * t
+            events = [{"name": "step", "ph": "X", "ts": ts, "dur": 1e6 * step, "pid": 0, "tid": 0,
+                       "args": {"iteration": it, "accepted": bool(ok), "new_E": new_E}},
+                      {"name": "propose", "ph": "X", "ts": 1e6 * t_prop, "dur": 1e6 * prop, "pid": 0, "tid": 1,
+                       "args": {"route_us": 1e6 * route}},
+                      {"name": "anneal", "ph": "C", "ts": ts, "pid": 0, "args": {"T": T, "E": curr_E}}]
+            for e in events:
+                f.write(("" if first else ",\n") + json.dumps(e))
+                first = False
+        f.write("\n]}\n")
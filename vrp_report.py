@@ -0,0 +1,178 @@
+import csv
+import json
+from html import escape
+import numpy as np
+from vrp_route import PICKUP, mixed_load_sequence, truck_members
+
+# =================================================================
+# 計画オブジェクト（ルートを1度だけ構築し、列（配列）で保持する）
+# =================================================================
+class Plan:
+    """
+    最終的な配車計画。トラックごとのルートを1度だけ構築し、全停車地点を列ごとの配列で持つ。
+      停車地点の列: truck / kind / job / loc / size / load / leg（直前地点からの距離）
+      トラックの列: n_jobs / distance / return_leg（最後の地点から拠点まで）/ offsets（停車列の範囲）
+    レポートの書き出しはすべてこのオブジェクトから行い、ルートを再計算しない。
+    """
+    def __init__(self, problem, assignment, num_trucks, route=None, objective=None):
+        """
+        route: ジョブ番号の昇順リスト → (訪問順のジョブ番号, 種別, 総距離)。
+               探索で使った RouteCache.route を渡せば再ルーティングせずに済む
+        objective: DispatchObjective を渡すと車両ごとの容量でルートを引く（route より優先）
+        """
+        if route is None:
+            route = lambda m: mixed_load_sequence(problem, m)
+        self.problem = problem
+        self.num_trucks = num_trucks
+        self.assignment = np.asarray(assignment)
+        self.capacity = (np.full(num_trucks, problem.truck_cap) if objective is None
+                         else objective.capacities)
+        members = truck_members(self.assignment, num_trucks)
+        if objective is not None:
+            seqs = [objective.route(t, m.tolist()) if len(m) else ([], [], 0) for t, m in enumerate(members)]
+        else:
+            seqs = [route(m.tolist()) if len(m) else ([], [], 0) for m in members]
+
+        self.n_jobs = np.array([len(m) for m in members])
+        self.distance = np.array([s[2] for s in seqs])
+        self.offsets = np.zeros(num_trucks + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum([len(s[0]) for s in seqs])
+        n = self.offsets[-1]
+        self.truck = np.repeat(np.arange(num_trucks), np.diff(self.offsets))
+        self.job = np.concatenate([np.asarray(s[0], dtype=np.int64) for s in seqs]) if n else np.zeros(0, np.int64)
+        self.kind = np.concatenate([np.asarray(s[1], dtype=np.int8) for s in seqs]) if n else np.zeros(0, np.int8)
+
+        # 以下は配列演算でまとめて計算する
+        is_pick = self.kind == PICKUP
+        self.loc = np.where(is_pick, problem.pickup[self.job], problem.drop[self.job])
+        self.size = problem.size[self.job]
+        # 積載量：全停車地点の累積和から、各トラックの最初の停車の直前までの累積を引く
+        prefix = np.cumsum(np.where(is_pick, self.size, -self.size))
+        first = self.offsets[self.truck]
+        self.load = prefix - np.where(first > 0, prefix[np.maximum(first - 1, 0)], 0) if n else prefix
+        start = self.offsets[:-1][self.n_jobs > 0]
+        prev = np.empty(n, dtype=np.int64)
+        if n:
+            prev[1:] = self.loc[:-1]
+            prev[start] = problem.depot
+        self.leg = problem.dist[prev, self.loc]
+        last = np.full(num_trucks, problem.depot)
+        busy = self.n_jobs > 0
+        last[busy] = self.loc[self.offsets[1:][busy] - 1]
+        self.return_leg = problem.dist[last, problem.depot]
+
+    @property
+    def total_distance(self):
+        return self.distance.sum()
+
+    def stops(self, t):
+        """トラック t の停車地点を (種別ラベル, 地点名, ジョブ番号, サイズ, 積載量, 区間距離) で順に返す"""
+        lo, hi = self.offsets[t], self.offsets[t + 1]
+        names = self.problem.locations
+        for k, loc, j, s, load, leg in zip(self.kind[lo:hi].tolist(), self.loc[lo:hi].tolist(),
+                                           self.job[lo:hi].tolist(), self.size[lo:hi].tolist(),
+                                           self.load[lo:hi].tolist(), self.leg[lo:hi].tolist()):
+            yield ("積" if k == PICKUP else "降"), names[loc], j, s, load, leg
+
+# =================================================================
+# 書き出し（開いたファイルへ1行ずつ流す）
+# =================================================================
+def write_text(plan, f, width=75):
+    """各車両の運行指示書（テキスト）"""
+    depot = plan.problem.locations[plan.problem.depot]
+    for t in range(plan.num_trucks):
+        f.write(f"\n{'=' * width}\n")
+        f.write(f"【積載車 {t}番】 運行指示書 (担当: {plan.n_jobs[t]}件 / 走行: {plan.distance[t]}km)\n")
+        f.write(f"{'行動':<4} | {'地点':<10} | {'Job':<6} | {'サイズ':<4} | {'積載量':<5} | {'移動'}\n")
+        f.write("-" * width + "\n")
+        if plan.n_jobs[t] == 0:
+            f.write(" ※ 稼働なし\n")
+            continue
+        for label, loc, j, s, load, leg in plan.stops(t):
+            act = f"[{label}]"
+            f.write(f"{act:<4} | {loc:<12} | ID:{j:<3} | {s:^6} | {load:^6} | {leg}km\n")
+        f.write("-" * width + "\n")
+        f.write(f" >>> 最終帰還: {plan.return_leg[t]}km (拠点:{depot}へ)\n")
+
+def write_csv(plan, f):
+    """停車地点ごとに1行の CSV（表計算・他システム連携用）"""
+    w = csv.writer(f)
+    w.writerow(["truck", "step", "type", "location", "job_id", "size", "load", "leg_km"])
+    for t in range(plan.num_trucks):
+        for step, row in enumerate(plan.stops(t)):
+            label, loc, j, s, load, leg = row
+            w.writerow([t, step, label, loc, j, s, load, leg])
+
+def write_json(plan, f):
+    """トラックごとに停車リストを持つ JSON。トラック単位で書き出すので全体を文字列にしない"""
+    f.write('{"total_distance": %s, "trucks": [' % json.dumps(plan.total_distance.item()))
+    for t in range(plan.num_trucks):
+        truck = {"truck": t, "n_jobs": int(plan.n_jobs[t]), "distance": plan.distance[t].item(),
+                 "return_leg": plan.return_leg[t].item(),
+                 "stops": [{"type": label, "loc": loc, "id": j, "size": s, "load": load, "dist": leg}
+                           for label, loc, j, s, load, leg in plan.stops(t)]}
+        f.write(("," if t else "") + "\n" + json.dumps(truck, ensure_ascii=False))
+    f.write("\n]}\n")
+
+HTML_HEAD = """<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        body { font-family: "Helvetica Neue", Arial, "Hiragino Kaku Gothic ProN", "Hiragino Sans", sans-serif; line-height: 1.6; color: #333; max-width: 1000px; margin: auto; padding: 20px; }
+        h1 { text-align: center; color: #2c3e50; border-bottom: 3px solid #2c3e50; padding-bottom: 10px; }
+        h2 { color: #2c3e50; border-left: 10px solid #2c3e50; padding-left: 15px; margin-top: 50px; background: #f4f7f6; }
+        .summary { background: #2c3e50; color: white; padding: 20px; border-radius: 8px; margin-bottom: 30px; display: flex; justify-content: space-around; }
+        .summary-item { text-align: center; }
+        .summary-item span { display: block; font-size: 1.2rem; font-weight: bold; }
+        table { width: 100%; border-collapse: collapse; margin-bottom: 30px; table-layout: fixed; }
+        th, td { border: 1px solid #ddd; padding: 12px; text-align: center; word-wrap: break-word; }
+        th { background-color: #34495e; color: white; font-size: 0.9rem; }
+        tr:nth-child(even) { background-color: #f9f9f9; }
+        .type-pick { color: #d35400; font-weight: bold; background: #fff5eb; }
+        .type-drop { color: #27ae60; font-weight: bold; background: #f0fff4; }
+        .footer { text-align: right; font-size: 0.8rem; color: #7f8c8d; margin-top: 50px; border-top: 1px solid #eee; padding-top: 10px; }
+        @media print {
+            h2 { page-break-before: always; }
+            .summary { background: #eee !important; color: black !important; border: 1px solid #333; }
+        }
+    </style>
+</head>
+<body>
+"""
+
+HTML_TABLE_HEAD = """            <table>
+                <thead>
+                    <tr>
+                        <th style="width: 15%;">行動</th>
+                        <th style="width: 25%;">地点</th>
+                        <th style="width: 15%;">Job ID</th>
+                        <th style="width: 15%;">サイズ</th>
+                        <th style="width: 15%;">積載量</th>
+                        <th style="width: 15%;">区間距離</th>
+                    </tr>
+                </thead>
+                <tbody>
+"""
+
+def write_html(plan, f, title="🚛 巡回配送計画 運行指示レポート", footer=""):
+    """運行指示レポート（HTML）。行ごとに f.write するので文書全体を文字列として持たない"""
+    f.write(HTML_HEAD)
+    f.write(f"""    <h1>{escape(title)}</h1>
+    <div class="summary">
+        <div class="summary-item">総走行距離<span>{plan.total_distance}km</span></div>
+        <div class="summary-item">車両台数<span>{plan.num_trucks}台</span></div>
+        <div class="summary-item">件数格差<span>{plan.n_jobs.min()} 〜 {plan.n_jobs.max()}件</span></div>
+    </div>
+""")
+    for t in range(plan.num_trucks):
+        f.write(f"""    <div class="truck-section">
+        <h2>車両 {t}番 指示書（担当: {plan.n_jobs[t]}件 / 走行距離: {plan.distance[t]}km）</h2>
+""")
+        f.write(HTML_TABLE_HEAD)
+        cap = plan.capacity[t]
+        for label, loc, j, s, load, leg in plan.stops(t):
+            cls = "type-pick" if label == "積" else "type-drop"
+            f.write(f'                    <tr><td class="{cls}">[{label}]</td><td>{escape(loc)}</td>'
+                    f'<td>ID:{j}</td><td>{s}</td><td>{load}/{cap}</td><td>{leg}km</td></tr>\n')
+        f.write("                </tbody>\n            </table>\n    </div>\n")
+    f.write(f'    <div class="footer">\n        {escape(footer)}\n    </div>\n</body>\n</html>\n')
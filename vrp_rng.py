@@ -0,0 +1,52 @@
+import numpy as np
+
+# =================================================================
+# まとめ引きの乱数源（焼きなましの内側ループ用）
+# =================================================================
+BIT_GENERATORS = {"pcg64": np.random.PCG64, "philox": np.random.Philox, "mt19937": np.random.MT19937}
+
+class BlockRNG:
+    """
+    numpy.random.Generator から一様乱数を block 個ずつまとめて引き、1個ずつ返す乱数源。
+    anneal / iter_anneal が使う randint / rand と同じ呼び方ができる。
+    スカラーの rng.randint / rng.rand は1回ごとに数μsかかる（ルートの差分計算より重いこともある）ので、
+    内側ループではPythonのリストから取り出すだけにする。
+      randint(n) = floor(u * n)（u は [0, 1) の倍精度。n が 2^53 より十分小さければ偏りは無視できる）
+    size を指定した randint / rand（初期解など一括の呼び出し）は Generator へそのまま渡す。
+    """
+    def __init__(self, generator=None, block=65536):
+        self.generator = np.random.default_rng(generator)
+        self.block = block
+        self._buf = []
+        self._pos = 0
+
+    def _next(self):
+        if self._pos >= len(self._buf):
+            self._buf = self.generator.random(self.block).tolist()
+            self._pos = 0
+        u = self._buf[self._pos]
+        self._pos += 1
+        return u
+
+    def rand(self, size=None):
+        if size is not None:
+            return self.generator.random(size)
+        return self._next()
+
+    def randint(self, low, high=None, size=None):
+        if high is None:
+            low, high = 0, low
+        if size is not None:
+            return self.generator.integers(low, high, size)
+        return low + int(self._next() * (high - low))
+
+def stream(seed, *key, bit_generator="pcg64", block=65536):
+    """
+    seed と (チェーン番号, ラウンド番号 …) から独立で再現可能な BlockRNG を作る。
+    bit_generator="mt19937" のときだけ従来どおりの np.random.RandomState を返す（過去の結果の再現用）。
+    """
+    ss = np.random.SeedSequence(seed, spawn_key=key)
+    bg = BIT_GENERATORS[bit_generator](ss)
+    if bit_generator == "mt19937":
+        return np.random.RandomState(bg)
+    return BlockRNG(np.random.Generator(bg), block=block)
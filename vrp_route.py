@@ -0,0 +1,290 @@
+import numpy as np
+try:
+    from numba import njit
+except ImportError:  # numba が無い環境では純Python版で計算する
+    njit = None
+
+# =================================================================
+# 混載ルート構築エンジン（配列モデル版）
+# =================================================================
+PICKUP, DROP = 0, 1
+
+def mixed_load_sequence(problem, job_indices):
+    """
+    近い方から「積み（空き容量がある場合）」か「降ろし」を選ぶ貪欲法。
+    戻り値: (訪問順のジョブ番号リスト, 種別リスト[PICKUP/DROP], 総距離)
+    同距離の場合は積みを優先し、候補リストの先頭側を選ぶ（旧 get_mixed_load_route と同じ）。
+    numba があればコンパイル済みカーネル、無ければ純Python版で計算する。
+    """
+    if njit is None:
+        return _mixed_load_python(problem, job_indices)
+    seq_jobs, seq_kinds, total, nstep = _run_kernel(problem, job_indices)
+    return seq_jobs[:nstep].tolist(), seq_kinds[:nstep].tolist(), total
+
+def _run_kernel(problem, job_indices):
+    jobs = np.asarray(job_indices, dtype=np.int64)
+    seq_jobs = np.empty(2 * len(jobs), dtype=np.int64)
+    seq_kinds = np.empty(2 * len(jobs), dtype=np.int8)
+    total, nstep = _route_kernel(problem.pickup, problem.drop, problem.size, problem.dist,
+                                 jobs, problem.truck_cap, problem.depot, seq_jobs, seq_kinds)
+    return seq_jobs, seq_kinds, total, nstep
+
+def _mixed_load_python(problem, job_indices):
+    """mixed_load_sequence の純Python版（numba 無し環境のフォールバック）"""
+    pickup, drop, size, dist = problem.as_lists()
+    cap = problem.truck_cap
+    unvisited_pickups = list(job_indices)
+    on_board = []
+    current_loc = problem.depot
+    row = dist[current_loc]
+    current_load = 0
+    total_dist = 0
+    seq_jobs, seq_kinds = [], []
+    while unvisited_pickups or on_board:
+        best_target, min_d, target_type = -1, float('inf'), PICKUP
+        for idx in unvisited_pickups:
+            if current_load + size[idx] <= cap:
+                d = row[pickup[idx]]
+                if d < min_d: min_d, best_target, target_type = d, idx, PICKUP
+        for idx in on_board:
+            d = row[drop[idx]]
+            if d < min_d: min_d, best_target, target_type = d, idx, DROP
+        if best_target < 0: break
+        total_dist += min_d
+        if target_type == PICKUP:
+            current_loc = pickup[best_target]; current_load += size[best_target]
+            unvisited_pickups.remove(best_target); on_board.append(best_target)
+        else:
+            current_loc = drop[best_target]; current_load -= size[best_target]
+            on_board.remove(best_target)
+        row = dist[current_loc]
+        seq_jobs.append(best_target); seq_kinds.append(target_type)
+    total_dist += row[problem.depot]
+    return seq_jobs, seq_kinds, total_dist
+
+def _mixed_load_kernel(pickup, drop, size, dist, jobs, cap, depot, seq_jobs, seq_kinds):
+    """
+    mixed_load_sequence のコンパイル用カーネル。list.remove の代わりに
+    未積み・積載中の配列を詰め直して順序を保つ（同点処理を純Python版と一致させるため）。
+    訪問順を seq_jobs / seq_kinds に書き込み、(総距離, 手数) を返す。
+    """
+    n = len(jobs)
+    pending = jobs.copy()                 # 未積み（元の順序）
+    n_pend = n
+    board = np.empty(n, dtype=np.int64)  # 積載中（積んだ順）
+    n_board = 0
+    loc = depot
+    load = 0
+    total = dist[depot, depot] * 0
+    nstep = 0
+    while n_pend > 0 or n_board > 0:
+        best, best_pos, kind = -1, -1, 0
+        min_d = dist[loc, loc]
+        for k in range(n_pend):
+            j = pending[k]
+            if load + size[j] <= cap:
+                d = dist[loc, pickup[j]]
+                if best < 0 or d < min_d:
+                    min_d, best, best_pos, kind = d, j, k, 0
+        for k in range(n_board):
+            j = board[k]
+            d = dist[loc, drop[j]]
+            if best < 0 or d < min_d:
+                min_d, best, best_pos, kind = d, j, k, 1
+        if best < 0:
+            break
+        total += min_d
+        if kind == 0:
+            loc = pickup[best]
+            load += size[best]
+            for k in range(best_pos, n_pend - 1):
+                pending[k] = pending[k + 1]
+            n_pend -= 1
+            board[n_board] = best
+            n_board += 1
+        else:
+            loc = drop[best]
+            load -= size[best]
+            for k in range(best_pos, n_board - 1):
+                board[k] = board[k + 1]
+            n_board -= 1
+        seq_jobs[nstep] = best
+        seq_kinds[nstep] = kind
+        nstep += 1
+    total += dist[loc, depot]
+    return total, nstep
+
+def _bucketed_kernel(pickup, drop, size, dist, jobs, cap, depot, seq_jobs, seq_kinds):
+    """
+    _mixed_load_kernel と同じ結果を、ジョブを地点ごとのバケツに分けて求める版。
+    1手ごとに見るのは「地点ごとの候補」だけなので、多くのジョブが少数の地点を
+    共有する場合に1手あたり O(ジョブ数) → O(地点数 × 容量) になる。
+      積み: (地点, サイズ) ごとに元の順序の待ち行列。積めるサイズの先頭のうち最も前のジョブが候補
+      降ろし: 地点ごとに積んだ順の待ち行列、先頭（最も早く積んだジョブ）が候補
+    同距離の場合は 積み優先 → 元の順序（積み）／積んだ順（降ろし）で決め、純Python版と一致させる。
+    """
+    n = len(jobs)
+    bucket_of = np.full(dist.shape[0], -1, dtype=np.int64)
+    locs = np.empty(2 * n, dtype=np.int64)
+    nb = 0
+    for k in range(n):
+        for l in (pickup[jobs[k]], drop[jobs[k]]):
+            if bucket_of[l] < 0:
+                bucket_of[l] = nb
+                locs[nb] = l
+                nb += 1
+    # 積み待ち行列は (地点, サイズ-1) を q = b*cap + s で番号付け（サイズは 1 以上。DispatchProblem が検査する）。
+    # 容量を超えるジョブは積めないので入れない
+    nq = nb * cap
+    p_start = np.zeros(nq + 1, dtype=np.int64)
+    d_start = np.zeros(nb + 1, dtype=np.int64)
+    for k in range(n):
+        j = jobs[k]
+        if size[j] <= cap:
+            p_start[bucket_of[pickup[j]] * cap + size[j]] += 1
+        d_start[bucket_of[drop[j]] + 1] += 1
+    for q in range(nq):
+        p_start[q + 1] += p_start[q]
+    for b in range(nb):
+        d_start[b + 1] += d_start[b]
+    p_items = np.empty(n, dtype=np.int64)
+    p_head = p_start[:nq].copy()
+    for k in range(n):
+        j = jobs[k]
+        if size[j] <= cap:
+            q = bucket_of[pickup[j]] * cap + size[j] - 1
+            p_items[p_head[q]] = k
+            p_head[q] += 1
+    p_head[:] = p_start[:nq]
+    d_items = np.empty(n, dtype=np.int64)
+    d_head = d_start[:nb].copy()
+    d_tail = d_start[:nb].copy()
+    board_seq = np.empty(n, dtype=np.int64)
+
+    n_pend, n_board, n_boarded = n, 0, 0
+    loc = depot
+    load = 0
+    total = dist[depot, depot] * 0
+    nstep = 0
+    while n_pend > 0 or n_board > 0:
+        kind, best_pos, best_q, best_b = -1, -1, -1, -1
+        min_d = dist[loc, loc]
+        room = cap - load
+        for b in range(nb):
+            d = dist[loc, locs[b]]
+            if kind >= 0 and d > min_d:
+                continue
+            for s in range(room):
+                q = b * cap + s
+                if p_head[q] == p_start[q + 1]:
+                    continue
+                pos = p_items[p_head[q]]
+                if kind < 0 or d < min_d or pos < best_pos:
+                    min_d, kind, best_pos, best_q = d, 0, pos, q
+        for b in range(nb):
+            if d_head[b] == d_tail[b]:
+                continue
+            d = dist[loc, locs[b]]
+            k = d_items[d_head[b]]
+            if kind < 0 or d < min_d or (kind == 1 and d == min_d and board_seq[k] < board_seq[best_pos]):
+                min_d, kind, best_pos, best_b = d, 1, k, b
+        if kind < 0:
+            break
+        total += min_d
+        j = jobs[best_pos]
+        if kind == 0:
+            loc = pickup[j]
+            load += size[j]
+            p_head[best_q] += 1
+            n_pend -= 1
+            db = bucket_of[drop[j]]
+            d_items[d_tail[db]] = best_pos
+            d_tail[db] += 1
+            board_seq[best_pos] = n_boarded
+            n_boarded += 1
+            n_board += 1
+        else:
+            loc = drop[j]
+            load -= size[j]
+            d_head[best_b] += 1
+            n_board -= 1
+        seq_jobs[nstep] = j
+        seq_kinds[nstep] = kind
+        nstep += 1
+    total += dist[loc, depot]
+    return total, nstep
+
+# ジョブ数がこれ以上かつ地点数より多いルートは地点バケツ版で計算する
+BUCKET_MIN_JOBS = 24
+
+def _route_kernel(pickup, drop, size, dist, jobs, cap, depot, seq_jobs, seq_kinds):
+    """ルートの規模に応じて全ジョブ走査版と地点バケツ版を使い分ける"""
+    if len(jobs) >= BUCKET_MIN_JOBS and dist.shape[0] < len(jobs):
+        return _bucketed_kernel(pickup, drop, size, dist, jobs, cap, depot, seq_jobs, seq_kinds)
+    return _mixed_load_kernel(pickup, drop, size, dist, jobs, cap, depot, seq_jobs, seq_kinds)
+
+if njit is not None:
+    _mixed_load_kernel = njit(cache=True)(_mixed_load_kernel)
+    _bucketed_kernel = njit(cache=True)(_bucketed_kernel)
+    _route_kernel = njit(cache=True)(_route_kernel)
+
+def route_cost(problem, job_indices):
+    """ルートの総距離のみを返す（アニーリングの評価用）"""
+    if len(job_indices) == 0: return 0
+    if njit is None:
+        return _mixed_load_python(problem, job_indices)[2]
+    return _run_kernel(problem, job_indices)[2]
+
+def route_history(problem, job_indices):
+    """旧 get_mixed_load_route と同じ形式の (history, total_dist) を返す（レポート用）"""
+    if len(job_indices) == 0: return [], 0
+    seq_jobs, seq_kinds, total = mixed_load_sequence(problem, job_indices)
+    return sequence_history(problem, seq_jobs, seq_kinds), total
+
+def sequence_history(problem, seq_jobs, seq_kinds):
+    """訪問順（ジョブ番号・種別）から運行指示書の行（dict）を組み立てる"""
+    pickup, drop, size, dist = problem.as_lists()
+    names = problem.locations
+    loc, load, history = problem.depot, 0, []
+    for idx, kind in zip(seq_jobs, seq_kinds):
+        idx = int(idx)
+        nxt = pickup[idx] if kind == PICKUP else drop[idx]
+        load += size[idx] if kind == PICKUP else -size[idx]
+        history.append({"type": "積" if kind == PICKUP else "降", "loc": names[nxt], "id": idx,
+                        "size": size[idx], "load": load, "dist": dist[loc][nxt]})
+        loc = nxt
+    return history
+
+def sorted_pickup_cost(problem, job_indices):
+    """
+    20260130.py の簡易ルート：積み地点のID順に並べ、1件ずつ積んで降ろす。
+    過積載には 1000/台 のペナルティを課す（1件ずつ運ぶので size > truck_cap の時のみ発生）。
+    """
+    if len(job_indices) == 0: return 0
+    pickup, drop, size, dist = problem.as_lists()
+    order = sorted(job_indices, key=lambda i: pickup[i])
+    current_loc, score, penalty = problem.depot, 0, 0
+    for idx in order:
+        score += dist[current_loc][pickup[idx]] + dist[pickup[idx]][drop[idx]]
+        current_loc = drop[idx]
+        if size[idx] > problem.truck_cap:
+            penalty += 1000 * (size[idx] - problem.truck_cap)
+    return score + dist[current_loc][problem.depot] + penalty
+
+# =================================================================
+# 全体エネルギー
+# =================================================================
+def truck_members(assignment, num_trucks):
+    """割当配列をトラックごとのジョブ番号（昇順）に分ける"""
+    assignment = np.asarray(assignment)
+    order = np.argsort(assignment, kind="stable")
+    bounds = np.searchsorted(assignment[order], np.arange(num_trucks + 1))
+    return [order[bounds[t]:bounds[t + 1]] for t in range(num_trucks)]
+
+def compute_energy(problem, assignment, num_trucks, route_fn=route_cost, count_weight=0.0):
+    """総走行距離 ＋ 件数の標準偏差 × count_weight"""
+    members = truck_members(assignment, num_trucks)
+    score = sum(route_fn(problem, m) for m in members)
+    if count_weight:
+        score += np.std([len(m) for m in members]) * count_weight
+    return score
@@ -0,0 +1,246 @@
+import numpy as np
+from vrp_route import PICKUP, njit, mixed_load_sequence
+
+# =================================================================
+# トラック内の訪問順（シーケンサー）の差し替え
+# =================================================================
+# シーケンサーは seq(problem, job_indices) -> (訪問順のジョブ番号, 種別, 総距離) の呼び出し可能オブジェクト。
+# mixed_load_sequence（貪欲法）と同じ形なので、RouteCache(sequencer=...) や
+# sequence_cost で作る route_fn を通してアニーリングにそのまま差し込める。
+
+def sequence_cost(sequencer, problem, job_indices):
+    """route_fn 用：partial(sequence_cost, sequencer, problem) として使う"""
+    if len(job_indices) == 0: return 0
+    return sequencer(problem, job_indices)[2]
+
+def route_cost_of(problem, seq_jobs, seq_kinds):
+    """訪問順が与えられたときの総距離（拠点発・拠点着）"""
+    pickup, drop, _, dist = problem.as_lists()
+    loc, total = problem.depot, 0
+    for j, k in zip(seq_jobs, seq_kinds):
+        nxt = pickup[j] if k == PICKUP else drop[j]
+        total += dist[loc][nxt]
+        loc = nxt
+    return total + dist[loc][problem.depot]
+
+# =================================================================
+# 厳密解（少数ジョブ用の動的計画法）
+# =================================================================
+def _exact_kernel(jobs, pickup, drop, size, dist, cap, depot, seq_jobs, seq_kinds):
+    """
+    状態 = (各ジョブの進み具合 [0:未積み / 1:積載中 / 2:完了] を3進数で表した整数, 現在地)。
+    表 V[状態, 現在地] に「そこから全部終えて拠点に戻るまでの最短距離」をメモし、
+    状態番号の大きい方（進んだ方）から順に埋める。積み→降ろしの順序と容量は遷移で守る。
+    最短ルートを seq_jobs / seq_kinds に書き、総距離を返す。
+    """
+    n = len(jobs)
+    pow3 = np.empty(n + 1, dtype=np.int64)
+    pow3[0] = 1
+    for i in range(n):
+        pow3[i + 1] = pow3[i] * 3
+    n_states = pow3[n]
+    # 現在地はこのルートに登場する地点（拠点・積み地・降ろし地）に番号を振り直す
+    locs = np.empty(2 * n + 1, dtype=np.int64)
+    locs[0] = depot
+    n_loc = 1
+    p_loc = np.empty(n, dtype=np.int64)
+    d_loc = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        for which in range(2):
+            l = pickup[jobs[i]] if which == 0 else drop[jobs[i]]
+            r = -1
+            for q in range(n_loc):
+                if locs[q] == l:
+                    r = q
+            if r < 0:
+                r = n_loc
+                locs[n_loc] = l
+                n_loc += 1
+            if which == 0:
+                p_loc[i] = r
+            else:
+                d_loc[i] = r
+    V = np.empty((n_states, n_loc), dtype=np.float64)
+    for r in range(n_loc):
+        V[n_states - 1, r] = dist[locs[r], depot]
+    for s in range(n_states - 2, -1, -1):
+        load = 0
+        for i in range(n):
+            if (s // pow3[i]) % 3 == 1:
+                load += size[jobs[i]]
+        for r in range(n_loc):
+            best = np.inf
+            for i in range(n):
+                digit = (s // pow3[i]) % 3
+                if digit == 0 and load + size[jobs[i]] <= cap:
+                    c = dist[locs[r], locs[p_loc[i]]] + V[s + pow3[i], p_loc[i]]
+                elif digit == 1:
+                    c = dist[locs[r], locs[d_loc[i]]] + V[s + pow3[i], d_loc[i]]
+                else:
+                    continue
+                if c < best:
+                    best = c
+            V[s, r] = best
+    # 拠点・全ジョブ未積みの状態から最短の遷移をたどって訪問順を復元する
+    s, r = 0, 0
+    for step in range(2 * n):
+        load = 0
+        for i in range(n):
+            if (s // pow3[i]) % 3 == 1:
+                load += size[jobs[i]]
+        best, bi, bk, br = np.inf, -1, 0, 0
+        for i in range(n):
+            digit = (s // pow3[i]) % 3
+            if digit == 0 and load + size[jobs[i]] <= cap:
+                c = dist[locs[r], locs[p_loc[i]]] + V[s + pow3[i], p_loc[i]]
+                k, nr = 0, p_loc[i]
+            elif digit == 1:
+                c = dist[locs[r], locs[d_loc[i]]] + V[s + pow3[i], d_loc[i]]
+                k, nr = 1, d_loc[i]
+            else:
+                continue
+            if c < best:
+                best, bi, bk, br = c, i, k, nr
+        seq_jobs[step] = jobs[bi]
+        seq_kinds[step] = bk
+        s += pow3[bi]
+        r = br
+    return V[0, 0]
+
+if njit is not None:
+    _exact_kernel = njit(cache=True)(_exact_kernel)
+
+class ExactSequencer:
+    """
+    動的計画法で、積み→降ろしの順序と容量を守る最短ルートを求める。
+    状態数は 3^n × 地点数なので n ≤ max_jobs の少数ジョブ用。
+    ジョブ数が max_jobs を超える場合と、容量を超えるジョブ（積めない）を含む場合は fallback に任せる。
+    """
+    def __init__(self, max_jobs=7, fallback=mixed_load_sequence):
+        self.max_jobs = max_jobs
+        self.fallback = fallback
+
+    def __call__(self, problem, job_indices):
+        jobs = np.asarray(job_indices, dtype=np.int64)
+        if len(jobs) > self.max_jobs or (problem.size[jobs] > problem.truck_cap).any():
+            return self.fallback(problem, job_indices)
+        if len(jobs) == 0:
+            return [], [], 0
+        seq_jobs = np.empty(2 * len(jobs), dtype=np.int64)
+        seq_kinds = np.empty(2 * len(jobs), dtype=np.int8)
+        _exact_kernel(jobs, problem.pickup, problem.drop, problem.size, problem.dist,
+                      problem.truck_cap, problem.depot, seq_jobs, seq_kinds)
+        seq_jobs, seq_kinds = seq_jobs.tolist(), seq_kinds.tolist()
+        # 総距離は距離行列の型（整数距離なら整数）で数え直す
+        return seq_jobs, seq_kinds, route_cost_of(problem, seq_jobs, seq_kinds)
+
+# =================================================================
+# 局所探索（中〜大規模のトラック用）
+# =================================================================
+def _sequence_cost_kernel(ev_job, ev_kind, pickup, drop, size, dist, cap, depot, flags, bound):
+    """
+    訪問順の総距離。積む前に降ろす・容量超過があれば inf（flags はジョブ別の作業領域）。
+    途中までの距離が bound を超えた時点で打ち切って inf を返す（距離は非負なので改善しない）。
+    """
+    for k in range(len(ev_job)):
+        flags[ev_job[k]] = False
+    loc, load = depot, 0
+    total = 0.0
+    for k in range(len(ev_job)):
+        j = ev_job[k]
+        if ev_kind[k] == 0:
+            load += size[j]
+            if load > cap:
+                return np.inf
+            flags[j] = True
+            nxt = pickup[j]
+        else:
+            if not flags[j]:
+                return np.inf
+            load -= size[j]
+            nxt = drop[j]
+        total += dist[loc, nxt]
+        if total >= bound:
+            return np.inf
+        loc = nxt
+    return total + dist[loc, depot]
+
+def _local_search_kernel(ev_job, ev_kind, pickup, drop, size, dist, cap, depot, max_passes):
+    """
+    or-opt（1地点を別の位置へ移す）と 2-opt（区間の反転）を、改善がなくなるか max_passes まで繰り返す。
+    積み→降ろしの順序と容量を満たさない候補は捨てる。ev_job / ev_kind をその場で書き換え、総距離を返す。
+    """
+    m = len(ev_job)
+    flags = np.zeros(len(pickup), dtype=np.bool_)
+    tj = np.empty(m, dtype=ev_job.dtype)
+    tk = np.empty(m, dtype=ev_kind.dtype)
+    cost = _sequence_cost_kernel(ev_job, ev_kind, pickup, drop, size, dist, cap, depot, flags, np.inf)
+    for _ in range(max_passes):
+        improved = False
+        # or-opt: 位置 i の地点を取り出して位置 p に挿し直す
+        for i in range(m):
+            for p in range(m):
+                if p == i:
+                    continue
+                n = 0
+                for k in range(m):
+                    if k == i:
+                        continue
+                    if n == p:
+                        tj[n] = ev_job[i]; tk[n] = ev_kind[i]; n += 1
+                    tj[n] = ev_job[k]; tk[n] = ev_kind[k]; n += 1
+                if n < m:
+                    tj[n] = ev_job[i]; tk[n] = ev_kind[i]
+                c = _sequence_cost_kernel(tj, tk, pickup, drop, size, dist, cap, depot, flags, cost)
+                if c < cost - 1e-9:
+                    cost = c
+                    ev_job[:] = tj; ev_kind[:] = tk
+                    improved = True
+        # 2-opt: 区間 [i, j] を反転
+        for i in range(m - 1):
+            for j in range(i + 1, m):
+                tj[:] = ev_job; tk[:] = ev_kind
+                tj[i:j + 1] = ev_job[i:j + 1][::-1]
+                tk[i:j + 1] = ev_kind[i:j + 1][::-1]
+                c = _sequence_cost_kernel(tj, tk, pickup, drop, size, dist, cap, depot, flags, cost)
+                if c < cost - 1e-9:
+                    cost = c
+                    ev_job[:] = tj; ev_kind[:] = tk
+                    improved = True
+        if not improved:
+            break
+    return cost
+
+if njit is not None:
+    _sequence_cost_kernel = njit(cache=True)(_sequence_cost_kernel)
+    _local_search_kernel = njit(cache=True)(_local_search_kernel)
+
+class LocalSearchSequencer:
+    """
+    初期順を start（既定は貪欲法）で作り、or-opt / 2-opt で改善する。
+    貪欲法が途中で止まった（容量超過で積めないジョブが残った）場合はその順のまま返す。
+    """
+    def __init__(self, start=mixed_load_sequence, max_passes=20):
+        self.start = start
+        self.max_passes = max_passes
+
+    def __call__(self, problem, job_indices):
+        seq_jobs, seq_kinds, total = self.start(problem, job_indices)
+        if len(seq_jobs) < 2 * len(job_indices) or len(seq_jobs) < 3:
+            return seq_jobs, seq_kinds, total
+        ev_job = np.array(seq_jobs, dtype=np.int64)
+        ev_kind = np.array(seq_kinds, dtype=np.int8)
+        cost = _local_search_kernel(ev_job, ev_kind, problem.pickup, problem.drop, problem.size,
+                                    problem.dist, problem.truck_cap, problem.depot, self.max_passes)
+        if not cost < total:
+            return seq_jobs, seq_kinds, total
+        return ev_job.tolist(), ev_kind.tolist(), route_cost_of(problem, ev_job.tolist(), ev_kind.tolist())
+
+class AutoSequencer:
+    """ジョブ数が exact_max 以下なら厳密解、それより多ければ局所探索を使う"""
+    def __init__(self, exact_max=7, max_passes=20):
+        self.local = LocalSearchSequencer(max_passes=max_passes)
+        self.exact = ExactSequencer(max_jobs=exact_max, fallback=self.local)
+
+    def __call__(self, problem, job_indices):
+        return self.exact(problem, job_indices)
@@ -0,0 +1,84 @@
+import json
+import os
+import numpy as np
+from vrp_model import DispatchProblem
+
+# =================================================================
+# 計画の保存・読み込み（.npy を並べたディレクトリ ＋ meta.json）
+# =================================================================
+# レイアウト:
+#   meta.json                 地点名・容量・拠点・トラック台数など小さな情報
+#   pickup/drop/size.npy      ジョブ（int32。DispatchProblem の内部形式そのまま）
+#   dist.npy                  距離行列（整数距離なら int64、それ以外は float64）
+#   coords.npy                地点座標（座標から作った問題のみ）
+#   assign.npy                割当（int32）
+#   seq_job/seq_kind/seq_offsets.npy  各トラックの訪問順（Plan の列。保存した場合のみ）
+# .npz は mmap_mode が効かない（zip の中身を毎回展開する）ので、配列ごとに生の .npy で置く。
+# np.load(mmap_mode="r") で開けば、100万件の日でも読み込みはページを触った分だけになる。
+
+FORMAT_VERSION = 1
+_JOB_FIELDS = ("pickup", "drop", "size")
+
+def save_plan(path, problem, assignment=None, num_trucks=None, plan=None):
+    """
+    問題（ジョブ・距離行列）と、あれば割当・訪問順を path（ディレクトリ）に書き出す。
+    plan（vrp_report.Plan）を渡すとその割当・トラック台数・訪問順をそのまま保存する。
+    """
+    if plan is not None:
+        assignment, num_trucks = plan.assignment, plan.num_trucks
+    os.makedirs(path, exist_ok=True)
+    n = problem.num_jobs
+    for name in _JOB_FIELDS:
+        np.save(os.path.join(path, name + ".npy"), np.asarray(getattr(problem, name)[:n], dtype=np.int32))
+    np.save(os.path.join(path, "dist.npy"), problem.dist)
+    if problem.coords is not None:
+        np.save(os.path.join(path, "coords.npy"), np.asarray(problem.coords))
+    if assignment is not None:
+        np.save(os.path.join(path, "assign.npy"), np.asarray(assignment, dtype=np.int32))
+    if plan is not None:
+        np.save(os.path.join(path, "seq_job.npy"), plan.job.astype(np.int32))
+        np.save(os.path.join(path, "seq_kind.npy"), plan.kind.astype(np.int8))
+        np.save(os.path.join(path, "seq_offsets.npy"), plan.offsets.astype(np.int64))
+    meta = {"version": FORMAT_VERSION, "locations": list(problem.locations),
+            "truck_cap": problem.truck_cap, "depot": problem.depot, "num_jobs": n,
+            "num_trucks": None if num_trucks is None else int(num_trucks),
+            "has_assignment": assignment is not None, "has_routes": plan is not None}
+    # meta.json は最後に書く（途中で落ちた保存は読み込み時に meta が無い／古いことで分かる）
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+
+def _load(path, name, mmap_mode):
+    return np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode)
+
+def load_meta(path):
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != FORMAT_VERSION:
+        raise ValueError(f"未対応の保存形式です: version={meta.get('version')}")
+    return meta
+
+def load_problem(path, mmap_mode="r"):
+    """
+    保存した問題を DispatchProblem として開く。mmap_mode="r" なら配列はファイルを直接参照する
+    （int32 のまま保存しているのでコピーは起きない）。extend_jobs で追加すると新しい領域へ移る。
+    """
+    meta = load_meta(path)
+    coords = _load(path, "coords", mmap_mode) if os.path.exists(os.path.join(path, "coords.npy")) else None
+    pickup, drop, size = (_load(path, name, mmap_mode) for name in _JOB_FIELDS)
+    return DispatchProblem(meta["locations"], _load(path, "dist", mmap_mode), pickup, drop, size,
+                           meta["truck_cap"], depot=meta["depot"], coords=coords)
+
+def load_plan(path, mmap_mode="r"):
+    """
+    保存した計画を開き (problem, assignment, num_trucks, routes) を返す。
+      assignment: 割当（保存していなければ None）。anneal(init=...) にそのまま渡せば前回の解から再開できる
+      routes: (seq_job, seq_kind, seq_offsets)。トラック t の訪問順は seq_*[offsets[t]:offsets[t+1]]
+              （保存していなければ None）
+    """
+    meta = load_meta(path)
+    problem = load_problem(path, mmap_mode)
+    assignment = _load(path, "assign", mmap_mode) if meta["has_assignment"] else None
+    routes = None
+    if meta["has_routes"]:
+        routes = tuple(_load(path, name, mmap_mode) for name in ("seq_job", "seq_kind", "seq_offsets"))
+    return problem, assignment, meta["num_trucks"], routes